@@ -0,0 +1,52 @@
+"""
+Recall@k and query time of the IVF index against exact matching, for a
+range of n_probe settings, on real CDDA item texts.
+
+    python -m benchmarks.bench_ann_recall CDDA_JSON
+"""
+import sys
+import time
+
+import numpy as np
+
+from p3_cdda.cdda_loader import CddaLoader
+from p3_embeddings.embedder import MiniLMEmbedder
+from p3_matcher.ann_index import IVFIndex, recall_report
+from benchmarks.bench_quantized_recall import MATERIAL_NAMES
+
+
+def main(root_dir: str = "CDDA_JSON", k: str = "10") -> None:
+    items = CddaLoader(root_dir, workers=None).load_all_items()
+    if not items:
+        print(f"No CDDA items under {root_dir}")
+        return
+
+    embedder = MiniLMEmbedder()
+    CddaLoader(root_dir).embed_items(items, embedder)
+    targets = np.stack([item.embedding for item in items])
+    queries = embedder.embed(MATERIAL_NAMES)
+
+    start = time.perf_counter()
+    index = IVFIndex.build([item.id for item in items], targets)
+    print(
+        f"{len(queries)} materials x {len(targets)} CDDA items, "
+        f"{len(index.centroids)} cells, built in {time.perf_counter() - start:.2f}s"
+    )
+
+    start = time.perf_counter()
+    (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ index.vectors.T
+    print(f"  exact     {1e3 * (time.perf_counter() - start):8.2f} ms")
+
+    n_probes = [p for p in (1, 2, 4, 8, 16, 32) if p <= len(index.centroids)]
+    report = recall_report(index, queries, int(k), n_probes)
+    for n_probe, stats in report.items():
+        start = time.perf_counter()
+        index.query(queries, int(k), n_probe)
+        print(
+            f"  n_probe {n_probe:<3} {1e3 * (time.perf_counter() - start):6.2f} ms   "
+            f"recall@{k} {stats['recall']:.3f}   scanned {stats['scanned']:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
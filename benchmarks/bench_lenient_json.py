@@ -0,0 +1,78 @@
+"""
+Compares the old CDDA parse path (json, then commentjson) with
+p3_cdda.lenient_json on a CDDA JSON tree.
+
+    python -m benchmarks.bench_lenient_json CDDA_JSON
+
+Every file is parsed as it is on disk and once more with a "//" comment
+and a trailing comma injected, which is the case the fallback exists for.
+"""
+import os
+import sys
+import json
+import time
+from typing import Callable, List
+
+import commentjson  # pip install commentjson
+
+from p3_cdda import lenient_json
+
+
+def old_parse(text: str):
+    try:
+        return json.loads(text)
+    except Exception:
+        return commentjson.loads(text)
+
+
+def make_lenient(text: str) -> str:
+    """
+    Adds a leading comment and a trailing comma to a JSON array document.
+    """
+    body = text.rstrip()
+    if body.endswith("]"):
+        body = body[:-1].rstrip() + ",\n]"
+    return "// injected comment\n" + body
+
+
+def collect_texts(root_dir: str) -> List[str]:
+    texts: List[str] = []
+    for root, _, files in os.walk(root_dir):
+        for f in sorted(files):
+            if f.endswith(".json"):
+                with open(os.path.join(root, f), "r", encoding="utf-8") as infile:
+                    texts.append(infile.read())
+    return texts
+
+
+def time_parser(parse: Callable[[str], object], texts: List[str]) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        parse(text)
+    return time.perf_counter() - start
+
+
+def main(root_dir: str = "CDDA_JSON") -> None:
+    texts = collect_texts(root_dir)
+    if not texts:
+        print(f"No .json files under {root_dir}")
+        return
+
+    lenient_texts = [make_lenient(t) for t in texts]
+    for text in lenient_texts:
+        assert lenient_json.loads(text) == old_parse(text)
+
+    size_mb = sum(len(t) for t in texts) / 1e6
+    print(f"{len(texts)} files, {size_mb:.1f} MB")
+
+    for label, batch in (("as shipped", texts), ("with comments", lenient_texts)):
+        old = time_parser(old_parse, batch)
+        new = time_parser(lenient_json.loads, batch)
+        print(
+            f"  {label:<14} old {old:8.3f}s   lenient {new:8.3f}s   "
+            f"speedup {old / new if new else float('inf'):6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
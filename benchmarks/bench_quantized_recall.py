@@ -0,0 +1,47 @@
+"""
+Recall and memory of float16 / int8 embeddings against float32 on real
+CDDA item texts, scored against a set of material names.
+
+    python -m benchmarks.bench_quantized_recall CDDA_JSON
+"""
+import sys
+
+import numpy as np
+
+from p3_cdda.cdda_loader import CddaLoader
+from p3_embeddings.embedder import MiniLMEmbedder
+from p3_embeddings.quantization import quantize, recall_at_k
+
+
+MATERIAL_NAMES = [
+    "iron", "steel", "stainless steel", "carbon steel", "copper", "bronze",
+    "brass", "aluminium", "lead", "silver", "gold", "tin", "titanium",
+    "wood", "plastic", "glass", "kevlar", "cotton", "leather", "wool",
+    "water", "paper", "rubber", "ceramic", "stone", "concrete", "bone",
+]
+
+
+def main(root_dir: str = "CDDA_JSON") -> None:
+    items = CddaLoader(root_dir, workers=None).load_all_items()
+    if not items:
+        print(f"No CDDA items under {root_dir}")
+        return
+
+    embedder = MiniLMEmbedder()
+    CddaLoader(root_dir).embed_items(items, embedder)
+    targets = np.stack([item.embedding for item in items])
+    queries = embedder.embed(MATERIAL_NAMES)
+
+    print(f"{len(queries)} materials x {len(targets)} CDDA items")
+    for precision in ("float32", "float16", "int8"):
+        stored = quantize(targets, precision)
+        r1 = recall_at_k(queries, targets, precision, k=1)
+        r10 = recall_at_k(queries, targets, precision, k=10)
+        print(
+            f"  {precision:<8} {stored.nbytes / 1e6:8.2f} MB   "
+            f"recall@1 {r1:.3f}   recall@10 {r10:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
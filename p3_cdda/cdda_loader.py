@@ -1,11 +1,51 @@
 import os
-import json
-from typing import Dict, List, Any, Optional
-
-import commentjson  # pip install commentjson
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Iterable, Deque
 
 from p3_core.types import CddaItem
+from p3_cdda import lenient_json, inheritance
+from p3_cdda.parse_cache import ParseCache
+from p3_cdda.sources import DirectorySource, SourceMember, ZipSource
+from p3_embeddings.dedup import DedupStats, embed_unique
 from p3_embeddings.embedder import MiniLMEmbedder
+from p3_recipes import recipe_index
+
+
+# Fields kept from each raw entry; everything else is dropped right after
+# parsing, so workers, the parse cache and inheritance only carry these.
+KEPT_FIELDS = frozenset({
+    "type", "id", "abstract", "name",
+    "weight", "volume", "price", "material", "recipes",
+    "copy-from", "extend", "delete", "relative", "proportional",
+    "result", "components", "result_mult", "obsolete",
+})
+
+# Parse cache schema: trimmed entries cached under another field set are stale
+FIELDS_SCHEMA = hashlib.sha1(",".join(sorted(KEPT_FIELDS)).encode("utf-8")).hexdigest()
+
+
+def plan_batches(sizes: List[int], n_batches: int) -> List[List[int]]:
+    """
+    Cuts positions 0..len(sizes)-1 into at most ~n_batches contiguous runs
+    of similar total size. Contiguous runs keep results in input order.
+    """
+    target = max(1, sum(sizes) // max(1, n_batches))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_size = 0
+
+    for pos, size in enumerate(sizes):
+        current.append(pos)
+        current_size += size
+        if current_size >= target:
+            batches.append(current)
+            current, current_size = [], 0
+
+    if current:
+        batches.append(current)
+    return batches
 
 
 class CddaLoader:
@@ -14,45 +54,86 @@ class CddaLoader:
     Extracts: id/abstract, name, weight, volume, price, materials, recipes.
     """
 
-    def __init__(self, root_dir: str):
+    def __init__(
+        self,
+        root_dir: str,
+        workers: Optional[int] = 1,
+        cache_path: Optional[str] = None,
+        manifest_path: Optional[str] = None,
+        archive_prefix: str = "data/json/",
+    ):
+        """
+        root_dir: directory holding the CDDA JSON tree, or a .zip archive
+                  of the CDDA repository (read in place, never extracted)
+        workers: number of processes used to parse files
+                 (1 = serial, None = one per CPU)
+        cache_path: optional file for the persistent parse cache; only
+                    added or changed files are re-parsed when it is set
+        manifest_path: optional GitHub listing (json_index.json) whose
+                       sha/size identify unchanged archive members
+        archive_prefix: path inside the archive to load JSON from
+        """
         self.root_dir = root_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_path = cache_path
+
+        if root_dir.lower().endswith(".zip"):
+            self.source = ZipSource(root_dir, prefix=archive_prefix, manifest_path=manifest_path)
+        else:
+            self.source = DirectorySource(root_dir)
+
+        # (path, error) for every file the last load could not parse
+        self.failed_files: List[Tuple[str, str]] = []
+        # ids caught in copy-from loops during the last load_all_items
+        self.inheritance_cycles: List[List[str]] = []
+        # result id -> normalized recipes, built by the last load_all_items
+        self.recipe_index: Dict[str, List[Dict[str, float]]] = {}
 
     def _parse_cdda_json(self, text: str) -> Any:
         """
-        CDDA JSON isn't always strict JSON. Try strict json first, then commentjson.
+        CDDA JSON isn't always strict JSON. Try strict json first, then strip
+        comments / trailing commas; commentjson only for anything stranger.
         """
-        try:
-            return json.loads(text)
-        except Exception:
-            return commentjson.loads(text)
+        return lenient_json.loads(text)
 
-    def _load_json_files(self) -> List[Dict[str, Any]]:
-        items: List[Dict[str, Any]] = []
+    def _read_entries(self, member: SourceMember) -> List[Dict[str, Any]]:
+        data = self._parse_cdda_json(self.source.read_text(member))
 
-        for root, _, files in os.walk(self.root_dir):
-            for f in files:
-                if not f.endswith(".json"):
-                    continue
+        # CDDA can be list or dict; dict may have "items"
+        if isinstance(data, dict):
+            data = data.get("items", [])
 
-                full_path = os.path.join(root, f)
+        if not isinstance(data, list):
+            return []
 
-                try:
-                    with open(full_path, "r", encoding="utf-8") as infile:
-                        text = infile.read()
-                    data = self._parse_cdda_json(text)
-                except Exception:
-                    continue
+        return [entry for entry in data if isinstance(entry, dict)]
 
-                # CDDA can be list or dict; dict may have "items"
-                if isinstance(data, dict):
-                    data = data.get("items", [])
+    def _load_file(self, member: SourceMember) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Parses one file down to the fields the loader uses.
+        Returns (entries, error); error is None when the file parsed.
+        """
+        try:
+            entries = self._read_entries(member)
+        except Exception as exc:
+            return [], f"{type(exc).__name__}: {exc}"
 
-                if isinstance(data, list):
-                    for entry in data:
-                        if isinstance(entry, dict):
-                            items.append(entry)
+        return [
+            {k: v for k, v in raw.items() if k in KEPT_FIELDS}
+            for raw in entries
+        ], None
 
-        return items
+    def _load_batch(self, members: List[SourceMember]) -> List[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        return [self._load_file(member) for member in members]
+
+    def _iter_converted(self, entries: Iterable[Dict[str, Any]]) -> Iterator[CddaItem]:
+        for raw in entries:
+            try:
+                item = self._dict_to_cdda_item(raw)
+            except Exception:
+                continue
+            if item:
+                yield item
 
     def _dict_to_cdda_item(self, raw: Dict[str, Any]) -> Optional[CddaItem]:
         item_id = raw.get("id") or raw.get("abstract")
@@ -83,24 +164,150 @@ class CddaLoader:
             physics=None,
         )
 
-    def load_all_items(self) -> List[CddaItem]:
-        raw_items = self._load_json_files()
-        final_items: List[CddaItem] = []
+    def _iter_file_results(self) -> Iterator[Tuple[str, List[Dict[str, Any]], Optional[str]]]:
+        """
+        Yields (name, entries, error) file by file, in sorted name order.
 
-        for raw in raw_items:
-            try:
-                item = self._dict_to_cdda_item(raw)
-                if item:
-                    final_items.append(item)
-            except Exception:
+        Cached files are served without parsing. With workers > 1 the files
+        left to parse are cut into contiguous batches of similar total size
+        and only a few batches are in flight at once, so the pool stays
+        evenly loaded while memory stays bounded by that window.
+        """
+        members = self.source.list_members()
+        cache = ParseCache(self.cache_path, FIELDS_SCHEMA) if self.cache_path else None
+
+        # (member, fingerprint, cached entries or None)
+        lookups: List[Tuple[SourceMember, Any, Any]] = []
+        for member in members:
+            cached, fingerprint = None, member.fingerprint
+            if cache is not None:
+                if fingerprint is None:
+                    cached, fingerprint = cache.lookup(member.location)
+                else:
+                    cached = cache.lookup_known(member.name, fingerprint)
+            lookups.append((member, fingerprint, cached))
+
+        to_parse = [i for i, lookup in enumerate(lookups) if lookup[2] is None]
+        pool = None
+        batches: List[List[int]] = []
+        batch_of: Dict[int, Tuple[int, int]] = {}
+        if self.workers > 1 and len(to_parse) > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+            sizes = [lookups[i][0].size for i in to_parse]
+            for cut in plan_batches(sizes, self.workers * 4):
+                batches.append([to_parse[j] for j in cut])
+            for b, batch in enumerate(batches):
+                for k, i in enumerate(batch):
+                    batch_of[i] = (b, k)
+
+        futures: Dict[int, Any] = {}
+        submitted = 0
+        window = self.workers * 2
+        finished = False
+
+        try:
+            for i, (member, fingerprint, cached) in enumerate(lookups):
+                if cached is not None:
+                    yield member.name, cached, None
+                    continue
+
+                if pool is None:
+                    entries, error = self._load_file(member)
+                else:
+                    b, k = batch_of[i]
+                    while submitted < len(batches) and submitted <= b + window:
+                        batch_members = [lookups[j][0] for j in batches[submitted]]
+                        futures[submitted] = pool.submit(self._load_batch, batch_members)
+                        submitted += 1
+                    entries, error = futures[b].result()[k]
+                    if k == len(batches[b]) - 1:
+                        del futures[b]
+
+                if cache is not None and error is None:
+                    cache.store(member.name, fingerprint, entries)
+                yield member.name, entries, error
+
+            finished = True
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if cache is not None:
+                if finished:
+                    cache.prune([m.name for m in members], root=self.root_dir)
+                cache.save()
+
+    def iter_entries(self, types: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streams raw entries (trimmed to KEPT_FIELDS) file by file.
+
+        types: optional set of CDDA entry types to keep (e.g. {"GENERIC", "TOOL"})
+
+        Files that fail to parse are listed in self.failed_files.
+        """
+        wanted = set(types) if types is not None else None
+        self.failed_files = []
+
+        for path, entries, error in self._iter_file_results():
+            if error is not None:
+                self.failed_files.append((path, error))
                 continue
+            for raw in entries:
+                if wanted is None or raw.get("type") in wanted:
+                    yield raw
+
+    def iter_items(self, types: Optional[Iterable[str]] = None) -> Iterator[CddaItem]:
+        """
+        Streams items file by file without holding the raw corpus in memory.
+        copy-from is not followed here, since a parent may live in a file
+        that has not been read yet; load_all_items resolves inheritance.
+        """
+        return self._iter_converted(self.iter_entries(types))
 
-        return final_items
+    def load_all_items(
+        self,
+        types: Optional[Iterable[str]] = None,
+        resolve_inheritance: bool = True,
+        recipe_alternatives: str = "first",
+    ) -> List[CddaItem]:
+        """
+        Loads every item under root_dir, in sorted file order.
+        With workers > 1 files are parsed in a process pool;
+        the result is identical to a serial load.
+
+        copy-from / abstract / extend / delete are resolved across the whole
+        tree first; ids caught in copy-from loops are listed in
+        self.inheritance_cycles.
 
-    def embed_items(self, items: List[CddaItem], embedder: MiniLMEmbedder) -> None:
-        if not items:
-            return
+        "recipe" entries are indexed by result in the same pass
+        (self.recipe_index) and each item gets its primary recipe as
+        item.recipes; recipe_alternatives picks how alternative
+        components are counted ("first" or "weighted"). Recipes have no
+        id or abstract key, so their own copy-from is not resolved: a
+        recipe that copies another contributes only its own components.
+
+        Files that fail to parse are listed in self.failed_files.
+        """
+        entries = list(self.iter_entries())
 
+        self.inheritance_cycles = []
+        if resolve_inheritance:
+            entries, self.inheritance_cycles = inheritance.resolve_inheritance(entries)
+
+        self.recipe_index = recipe_index.build_recipe_index(entries, recipe_alternatives)
+
+        if types is not None:
+            wanted = set(types)
+            entries = [raw for raw in entries if raw.get("type") in wanted]
+
+        items = list(self._iter_converted(entries))
+        recipe_index.attach_recipes(items, self.recipe_index)
+        return items
+
+    def embed_items(self, items: List[CddaItem], embedder: MiniLMEmbedder) -> DedupStats:
+        """
+        Embeds "name + materials" for every item; identical texts
+        (variants, abstracts, mod copies) are encoded once.
+        """
         texts: List[str] = []
         for item in items:
             parts: List[str] = []
@@ -110,6 +317,7 @@ class CddaLoader:
                 parts.extend(item.materials)
             texts.append(" ".join(parts))
 
-        embeddings = embedder.embed(texts)
+        embeddings, stats = embed_unique(embedder, texts)
         for item, emb in zip(items, embeddings):
             item.embedding = emb
+        return stats
@@ -0,0 +1,195 @@
+import copy
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from p3_core.columnar_store import QUANTITY_UNITS
+
+
+# Keys that steer inheritance and are never themselves inherited.
+DIRECTIVE_KEYS = ("copy-from", "extend", "delete", "relative", "proportional")
+
+
+def entry_key(entry: Dict[str, Any]) -> Optional[str]:
+    """
+    The id an entry can be copied from: its id, or its abstract name.
+    """
+    key = entry.get("id") or entry.get("abstract")
+    if isinstance(key, str):
+        return key
+    return None
+
+
+def _split_quantity(value: Any) -> Optional[Tuple[float, str]]:
+    """
+    250 -> (250.0, ""), "250 g" -> (250.0, "g"); None for anything else.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value), ""
+    if isinstance(value, str):
+        parts = value.strip().split(None, 1)
+        try:
+            number = float(parts[0])
+        except (ValueError, IndexError):
+            return None
+        return number, parts[1] if len(parts) > 1 else ""
+    return None
+
+
+def _unit_factor(field: str, base_unit: str, delta_unit: str) -> Optional[float]:
+    """
+    Multiplier taking delta_unit to base_unit ("g" -> "kg": 0.001), from the
+    field's unit table, or any table knowing both units; None if none does.
+    """
+    if field in QUANTITY_UNITS:
+        tables = [QUANTITY_UNITS[field]]
+    elif base_unit and delta_unit:
+        tables = list(QUANTITY_UNITS.values())
+    else:
+        return None   # a bare number has no unit outside a known field
+    for table in tables:
+        if base_unit in table and delta_unit in table:
+            return table[delta_unit] / table[base_unit]
+    return None
+
+
+def _combine(base: Any, delta: Any, multiply: bool, field: str = "") -> Any:
+    """
+    Applies a CDDA "relative" (add) or "proportional" (multiply) modifier.
+    A relative delta in another unit of the same dimension ("200 g" on
+    "1 kg") is converted to the base's unit first. Values the modifier
+    cannot apply to are returned unchanged.
+    """
+    base_q = _split_quantity(base)
+    delta_q = _split_quantity(delta)
+    if base_q is None or delta_q is None:
+        return base
+
+    base_num, base_unit = base_q
+    delta_num, delta_unit = delta_q
+    if multiply:
+        number = base_num * delta_num
+    elif delta_unit in ("", base_unit):
+        number = base_num + delta_num
+    else:
+        factor = _unit_factor(field, base_unit, delta_unit)
+        if factor is None:
+            return base
+        number = base_num + delta_num * factor
+
+    if isinstance(base, str):
+        text = f"{number:g}"
+        return f"{text} {base_unit}" if base_unit else text
+    if isinstance(base, int) and number.is_integer():
+        return int(number)
+    return number
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return list(value)
+    return [value]
+
+
+def _apply_directives(merged: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    for field, delta in (entry.get("relative") or {}).items():
+        if field in merged:
+            merged[field] = _combine(merged[field], delta, multiply=False, field=field)
+
+    for field, factor in (entry.get("proportional") or {}).items():
+        if field in merged:
+            merged[field] = _combine(merged[field], factor, multiply=True)
+
+    for field, extra in (entry.get("extend") or {}).items():
+        merged[field] = _as_list(merged.get(field)) + _as_list(extra)
+
+    for field, removed in (entry.get("delete") or {}).items():
+        if field not in merged:
+            continue
+        drop = _as_list(removed)
+        merged[field] = [v for v in _as_list(merged[field]) if v not in drop]
+
+
+def _merge(parent: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+    merged = {
+        k: copy.deepcopy(v)
+        for k, v in parent.items()
+        if k not in ("id", "abstract") and k not in DIRECTIVE_KEYS
+    }
+    for k, v in entry.items():
+        if k not in DIRECTIVE_KEYS:
+            merged[k] = v
+    _apply_directives(merged, entry)
+    return merged
+
+
+def resolve_inheritance(
+    entries: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[List[str]]]:
+    """
+    Resolves CDDA copy-from / abstract inheritance for a list of entries.
+
+    Builds an id index once, then resolves every entry in a single memoized
+    depth-first pass, so each template is merged once however many entries
+    copy from it. A copy-from naming the entry's own id refers to the
+    previous definition of that id (the mod override idiom).
+
+    Returns (resolved entries in input order, cycles). Each cycle is the
+    list of ids involved; entries in a cycle, or whose parent is missing,
+    are returned without inheritance applied.
+    """
+    positions: Dict[str, List[int]] = {}
+    for pos, entry in enumerate(entries):
+        key = entry_key(entry)
+        if key is not None:
+            positions.setdefault(key, []).append(pos)
+
+    def parent_of(pos: int) -> Optional[int]:
+        target = entries[pos].get("copy-from")
+        if not isinstance(target, str) or target not in positions:
+            return None
+        candidates = positions[target]
+        if target == entry_key(entries[pos]):
+            i = bisect_left(candidates, pos)
+            return candidates[i - 1] if i else None
+        return candidates[-1]
+
+    resolved: List[Any] = [None] * len(entries)
+    in_progress: Dict[int, int] = {}  # pos -> index on the current chain
+    cycles: List[List[str]] = []
+
+    for start in range(len(entries)):
+        if resolved[start] is not None:
+            continue
+
+        chain: List[int] = []
+        pos: Optional[int] = start
+
+        # walk up until a resolved ancestor, a root, or a cycle
+        while pos is not None and resolved[pos] is None:
+            if pos in in_progress:
+                loop = chain[in_progress[pos]:]
+                cycles.append([str(entry_key(entries[p])) for p in loop])
+                for p in loop:
+                    resolved[p] = dict(entries[p])
+                del chain[in_progress[pos]:]
+                pos = None
+                break
+            in_progress[pos] = len(chain)
+            chain.append(pos)
+            pos = parent_of(pos)
+
+        # merge back down the chain, root first
+        for p in reversed(chain):
+            parent = parent_of(p)
+            if parent is None or resolved[parent] is None:
+                resolved[p] = dict(entries[p])
+            else:
+                resolved[p] = _merge(resolved[parent], entries[p])
+
+        in_progress.clear()
+
+    return resolved, cycles
@@ -0,0 +1,50 @@
+import re
+import json
+from typing import Any
+
+
+# One left-to-right pass over the text. String literals are matched first and
+# kept verbatim, so "//" or "," inside a string is never touched; everything
+# else the pattern matches (comments, trailing commas) is dropped.
+_LENIENT_TOKEN_RE = re.compile(
+    r"""
+      ("(?:[^"\\\n]|\\.)*")                             # string literal
+    | //[^\n]*                                          # line comment
+    | /\*[\s\S]*?\*/                                    # block comment
+    | ,(?=(?:\s|//[^\n]*|/\*[\s\S]*?\*/)*[\]}])         # trailing comma
+    """,
+    re.VERBOSE,
+)
+
+
+def strip_comments_and_trailing_commas(text: str) -> str:
+    """
+    Returns text with // and /* */ comments and trailing commas removed.
+    String contents are preserved exactly.
+    """
+    # an unmatched group expands to "", so only string literals survive
+    return _LENIENT_TOKEN_RE.sub(r"\1", text)
+
+
+def loads(text: str) -> Any:
+    """
+    Parses CDDA-flavoured JSON.
+
+    Strict json first (most files are strict), then the stripped text through
+    the C decoder, and only for anything still rejected the slow commentjson
+    grammar parser.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    stripped = strip_comments_and_trailing_commas(text)
+    try:
+        return json.loads(stripped)
+    except ValueError as exc:
+        try:
+            import commentjson  # pip install commentjson
+        except ImportError:
+            raise exc
+        return commentjson.loads(text)
@@ -0,0 +1,134 @@
+import os
+import pickle
+import hashlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+# Bump whenever the cached payload changes shape, so old caches are ignored.
+# Callers that trim entries also pass a schema (see CddaLoader), so a
+# change to the kept fields invalidates the cache without a bump.
+CACHE_VERSION = 4
+
+# (size, mtime_ns, sha1 of content); sources with a known content id
+# use (size, 0, content id)
+Fingerprint = Tuple[int, int, str]
+
+
+def _sha1_file(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Persistent cache of parsed CDDA files, one entry per source path.
+
+    An entry is reused when the file's size and mtime are unchanged, or,
+    if only the mtime moved, when its content hash still matches.
+    """
+
+    def __init__(self, cache_path: str, schema: str = ""):
+        """
+        schema: identifies the shape of the cached payloads; a cache written
+                under another schema is ignored
+        """
+        self.cache_path = cache_path
+        self.schema = schema
+        self.entries: Dict[str, Tuple[Fingerprint, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+        self._read()
+
+    def _read(self) -> None:
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                stored = pickle.load(f)
+        except Exception:
+            return
+        if isinstance(stored, dict) and (stored.get("version"), stored.get("schema")) == (CACHE_VERSION, self.schema):
+            self.entries = stored.get("entries", {})
+
+    def lookup(self, path: str) -> Tuple[Optional[Any], Fingerprint]:
+        """
+        Returns (payload, fingerprint). payload is None on a miss; the
+        fingerprint is taken before parsing so it can be passed to store().
+        """
+        key = os.path.abspath(path)
+        st = os.stat(path)
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            (size, mtime_ns, sha1), payload = entry
+            if size == st.st_size and mtime_ns == st.st_mtime_ns:
+                self.hits += 1
+                return payload, (size, mtime_ns, sha1)
+
+        fingerprint = (st.st_size, st.st_mtime_ns, _sha1_file(path))
+
+        if entry is not None and entry[0][2] == fingerprint[2]:
+            # touched but unchanged: refresh the stat part only
+            self.entries[key] = (fingerprint, entry[1])
+            self._dirty = True
+            self.hits += 1
+            return entry[1], fingerprint
+
+        self.misses += 1
+        return None, fingerprint
+
+    def lookup_known(self, key: str, fingerprint: Fingerprint) -> Optional[Any]:
+        """
+        Like lookup(), for sources that already know a content fingerprint
+        (manifest sha, zip CRC) and so need no stat or hashing.
+        """
+        entry = self.entries.get(os.path.abspath(key))
+        if entry is not None and entry[0] == fingerprint:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def store(self, path: str, fingerprint: Fingerprint, payload: Any) -> None:
+        self.entries[os.path.abspath(path)] = (fingerprint, payload)
+        self._dirty = True
+
+    def prune(self, live_paths: Iterable[str], root: Optional[str] = None) -> int:
+        """
+        Drops entries for files that no longer exist. With root given, only
+        entries under root are considered, so one cache can serve several trees.
+        Returns how many entries were dropped.
+        """
+        live = {os.path.abspath(p) for p in live_paths}
+        prefix = os.path.join(os.path.abspath(root), "") if root else ""
+        stale = [
+            key for key in self.entries
+            if key.startswith(prefix) and key not in live
+        ]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"version": CACHE_VERSION, "schema": self.schema, "entries": self.entries},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
@@ -0,0 +1,140 @@
+import os
+import json
+import zipfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class SourceMember:
+    """
+    One JSON file of a CDDA source.
+    """
+    name: str       # stable key: ordering, parse cache, error reports
+    location: str   # where the source reads it from (path / archive member)
+    size: int
+    # (size, 0, content id) when the source already knows the content
+    # (manifest sha, zip CRC); None means stat and hash the file on disk
+    fingerprint: Optional[Tuple[int, int, str]] = None
+
+
+class DirectorySource:
+    """
+    .json files under a directory on disk.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def list_members(self) -> List[SourceMember]:
+        members: List[SourceMember] = []
+
+        for root, _, files in os.walk(self.root_dir):
+            for f in files:
+                if f.endswith(".json"):
+                    path = os.path.join(root, f)
+                    members.append(SourceMember(path, path, os.path.getsize(path)))
+
+        return sorted(members, key=lambda m: m.name)
+
+    def read_text(self, member: SourceMember) -> str:
+        with open(member.location, "r", encoding="utf-8") as infile:
+            return infile.read()
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Tuple[int, str]]:
+    """
+    Reads a GitHub contents listing (json_index.json / json_root.json)
+    into path -> (size, sha) for its file entries.
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        listing = json.load(f)
+
+    return {
+        entry["path"]: (int(entry["size"]), entry["sha"])
+        for entry in listing
+        if entry.get("type") == "file"
+    }
+
+
+# One open handle per archive per process, so pool workers do not re-read
+# the central directory for every file they are handed. Keyed by
+# (path, mtime_ns, size): a replaced archive gets a fresh handle and the
+# handle on the old file is closed.
+_OPEN_ARCHIVES: Dict[Tuple[str, int, int], zipfile.ZipFile] = {}
+
+# A forked worker must not share the parent's handle (and so its file
+# offset); the child drops the references and opens its own. The parent's
+# descriptors are left alone.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_OPEN_ARCHIVES.clear)
+
+
+def _open_archive(archive_path: str) -> zipfile.ZipFile:
+    st = os.stat(archive_path)
+    key = (archive_path, st.st_mtime_ns, st.st_size)
+    archive = _OPEN_ARCHIVES.get(key)
+    if archive is None:
+        for old in [k for k in _OPEN_ARCHIVES if k[0] == archive_path]:
+            _OPEN_ARCHIVES.pop(old).close()
+        archive = zipfile.ZipFile(archive_path)
+        _OPEN_ARCHIVES[key] = archive
+    return archive
+
+
+class ZipSource:
+    """
+    .json members of a zip archive (e.g. a GitHub "Download ZIP" of CDDA),
+    read and decompressed in memory; nothing is extracted to disk.
+
+    Member paths are taken relative to the archive's single top-level
+    folder, if it has one, so "Cataclysm-DDA-master/data/json/x.json"
+    becomes "data/json/x.json" and lines up with the manifest paths.
+    """
+
+    def __init__(
+        self,
+        archive_path: str,
+        prefix: str = "data/json/",
+        manifest_path: Optional[str] = None,
+    ):
+        """
+        prefix: only members under this relative path are loaded
+        manifest_path: optional GitHub contents listing; a member whose size
+                       matches its manifest entry has the manifest sha added
+                       to its fingerprint (the zip CRC is always part of it,
+                       so a same-size edit newer than the manifest still
+                       invalidates the cache)
+        """
+        self.archive_path = os.path.abspath(archive_path)
+        self.prefix = prefix
+        self.manifest = load_manifest(manifest_path) if manifest_path else {}
+
+    def list_members(self) -> List[SourceMember]:
+        infos = [i for i in _open_archive(self.archive_path).infolist() if not i.is_dir()]
+
+        top_dirs = {info.filename.split("/", 1)[0] for info in infos}
+        strip = len(top_dirs) == 1 and all("/" in i.filename for i in infos)
+
+        members: List[SourceMember] = []
+        for info in infos:
+            rel = info.filename.split("/", 1)[1] if strip else info.filename
+            if not rel.startswith(self.prefix) or not rel.endswith(".json"):
+                continue
+
+            content_id = f"crc32:{info.CRC:08x}"
+            known = self.manifest.get(rel)
+            if known is not None and known[0] == info.file_size:
+                content_id = f"{known[1]}+{content_id}"
+
+            members.append(SourceMember(
+                name=os.path.join(self.archive_path, rel),
+                location=info.filename,
+                size=info.file_size,
+                fingerprint=(info.file_size, 0, content_id),
+            ))
+
+        return sorted(members, key=lambda m: m.name)
+
+    def read_text(self, member: SourceMember) -> str:
+        return _open_archive(self.archive_path).read(member.location).decode("utf-8")
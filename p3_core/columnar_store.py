@@ -0,0 +1,328 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from p3_core.types import CddaItem, WikidataMaterial
+from p3_embeddings.quantization import quantize
+
+
+# -----------------------------------------
+# CDDA quantity strings -> base units
+# -----------------------------------------
+# weight -> grams, volume -> millilitres, price -> cents
+QUANTITY_UNITS: Dict[str, Dict[str, float]] = {
+    "weight": {"": 1.0, "mg": 0.001, "g": 1.0, "kg": 1000.0},
+    "volume": {"": 1.0, "ml": 1.0, "l": 1000.0, "L": 1000.0},
+    "price": {"": 1.0, "cent": 1.0, "USD": 100.0, "kUSD": 100_000.0},
+}
+
+
+def parse_quantity(value: Any, units: Dict[str, float]) -> Optional[float]:
+    """
+    250 -> 250.0, "250 g" -> 250.0, "1 kg" -> 1000.0 (with weight units).
+    Returns None for missing or unparseable values.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip()
+    number_end = len(text)
+    for pos, ch in enumerate(text):
+        if not (ch.isdigit() or ch in ".-+eE"):
+            number_end = pos
+            break
+    try:
+        number = float(text[:number_end])
+    except ValueError:
+        return None
+
+    scale = units.get(text[number_end:].strip())
+    if scale is None:
+        return None
+    return number * scale
+
+
+# -----------------------------------------
+# Row views
+# -----------------------------------------
+class _NumericField:
+    """
+    Float column with a presence mask; reads back None where unset.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        store, row = view._store, view._row
+        if not store.masks[self.name][row]:
+            return None
+        return float(store.columns[self.name][row])
+
+    def __set__(self, view, value):
+        store, row = view._store, view._row
+        number = parse_quantity(value, store.QUANTITY_UNITS.get(self.name, {"": 1.0}))
+        store.masks[self.name][row] = number is not None
+        store.columns[self.name][row] = np.nan if number is None else number
+
+
+class _ObjectField:
+    """
+    Per-row Python object (names, lists, dicts).
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        return view._store.objects[self.name][view._row]
+
+    def __set__(self, view, value):
+        view._store.objects[self.name][view._row] = value
+
+
+class _EmbeddingField:
+    """
+    Row of the store's embedding matrix; None where no embedding is set.
+    """
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        store, row = view._store, view._row
+        if store.embeddings is None or not store.embedding_mask[row]:
+            return None
+        return store.embeddings[row]
+
+    def __set__(self, view, value):
+        view._store.set_embedding(view._row, value)
+
+
+class _RowView:
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "_ColumnStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._store.ids[self._row]!r})"
+
+
+class CddaItemView(_RowView):
+    """
+    Row of an ItemStore with the attributes of CddaItem. Numeric fields are
+    in base units: weight in grams, volume in millilitres, price in cents.
+    """
+    __slots__ = ()
+
+    id = property(lambda self: self._store.ids[self._row])
+    name = _ObjectField()
+    weight = _NumericField()
+    volume = _NumericField()
+    price = _NumericField()
+    materials = _ObjectField()
+    recipes = _ObjectField()
+    embedding = _EmbeddingField()
+    constituents = _ObjectField()
+    physics = _ObjectField()
+
+    def to_dataclass(self) -> CddaItem:
+        return CddaItem(
+            id=self.id,
+            name=self.name,
+            weight=self.weight,
+            volume=self.volume,
+            price=self.price,
+            materials=self.materials,
+            recipes=self.recipes,
+            embedding=self.embedding,
+            constituents=self.constituents,
+            physics=self.physics,
+        )
+
+
+class WikidataMaterialView(_RowView):
+    """
+    Row of a MaterialStore with the attributes of WikidataMaterial.
+    """
+    __slots__ = ()
+
+    qid = property(lambda self: self._store.ids[self._row])
+    label = _ObjectField()
+    description = _ObjectField()
+    density = _NumericField()
+    melting_point = _NumericField()
+    tensile_strength = _NumericField()
+    thermal_conductivity = _NumericField()
+    aliases = _ObjectField()
+    embedding = _EmbeddingField()
+    units = _ObjectField()
+    flags = _ObjectField()
+
+    def to_dataclass(self) -> WikidataMaterial:
+        return WikidataMaterial(
+            qid=self.qid,
+            label=self.label,
+            description=self.description,
+            density=self.density,
+            melting_point=self.melting_point,
+            tensile_strength=self.tensile_strength,
+            thermal_conductivity=self.thermal_conductivity,
+            aliases=self.aliases,
+            embedding=self.embedding,
+            units=self.units,
+            flags=self.flags,
+        )
+
+
+# -----------------------------------------
+# Stores
+# -----------------------------------------
+class _ColumnStore:
+    """
+    Column-oriented table: one float64 array (+ presence mask) per numeric
+    field, one list per object field, and a single contiguous
+    (rows, dim) embedding matrix, with an id -> row index.
+    """
+
+    NUMERIC_FIELDS: Tuple[str, ...] = ()
+    OBJECT_FIELDS: Tuple[str, ...] = ()
+    QUANTITY_UNITS: Dict[str, Dict[str, float]] = {}
+    VIEW = _RowView
+
+    def __init__(self, ids: Sequence[str], precision: str = "float32"):
+        """
+        precision: embedding storage, "float32", "float16" or "int8"
+                   (see p3_embeddings.quantization)
+        """
+        n = len(ids)
+        self.ids: List[str] = list(ids)
+        self.index: Dict[str, int] = {id_: row for row, id_ in enumerate(self.ids)}
+
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.full(n, np.nan) for name in self.NUMERIC_FIELDS
+        }
+        self.masks: Dict[str, np.ndarray] = {
+            name: np.zeros(n, dtype=bool) for name in self.NUMERIC_FIELDS
+        }
+        self.objects: Dict[str, List[Any]] = {
+            name: [None] * n for name in self.OBJECT_FIELDS
+        }
+
+        self.precision = precision
+        self.embedding_dtype = quantize(np.zeros((1, 1)), precision).dtype
+        self.embeddings: Optional[np.ndarray] = None
+        self.embedding_mask = np.zeros(n, dtype=bool)
+
+    @classmethod
+    def _from_records(cls, ids: Sequence[str], records: Sequence[Any], **kwargs):
+        store = cls(ids, **kwargs)
+        for row, record in enumerate(records):
+            view = store.VIEW(store, row)
+            for name in cls.NUMERIC_FIELDS:
+                setattr(view, name, getattr(record, name))
+            for name in cls.OBJECT_FIELDS:
+                # own copy per row, so in-place column edits never reach the records
+                value = getattr(record, name)
+                setattr(view, name, value.copy() if isinstance(value, (list, dict)) else value)
+
+        rows = [r for r, rec in enumerate(records) if rec.embedding is not None]
+        if rows:
+            matrix = np.stack([np.asarray(records[r].embedding) for r in rows])
+            store.set_embeddings(matrix, rows)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[_RowView]:
+        for row in range(len(self.ids)):
+            yield self.VIEW(self, row)
+
+    def __getitem__(self, key: Union[int, str]) -> _RowView:
+        row = self.index[key] if isinstance(key, str) else int(key)
+        if not -len(self.ids) <= row < len(self.ids):
+            raise IndexError(key)
+        return self.VIEW(self, row % len(self.ids))
+
+    def column(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (values, mask) for a numeric field; values are NaN where mask is False.
+        """
+        return self.columns[name], self.masks[name]
+
+    def set_embedding(self, row: int, value: Optional[Sequence[float]]) -> None:
+        if value is None:
+            self.embedding_mask[row] = False
+            return
+        vector = np.asarray(value)
+        if self.embeddings is None:
+            self.embeddings = np.zeros((len(self.ids), vector.shape[-1]), dtype=self.embedding_dtype)
+        self.embeddings[row] = quantize(vector, self.precision)
+        self.embedding_mask[row] = True
+
+    def set_embeddings(self, matrix: np.ndarray, rows: Optional[Sequence[int]] = None) -> None:
+        """
+        Writes many embeddings at once (all rows when rows is None).
+        """
+        matrix = np.asarray(matrix)
+        if self.embeddings is None:
+            self.embeddings = np.zeros((len(self.ids), matrix.shape[1]), dtype=self.embedding_dtype)
+        target = slice(None) if rows is None else list(rows)
+        self.embeddings[target] = quantize(matrix, self.precision)
+        self.embedding_mask[target] = True
+
+    def embedding_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (matrix of rows that have an embedding, their row numbers).
+        """
+        rows = np.flatnonzero(self.embedding_mask)
+        if self.embeddings is None:
+            return np.zeros((0, 0), dtype=self.embedding_dtype), rows
+        if len(rows) == len(self.ids):
+            return self.embeddings, rows
+        return self.embeddings[rows], rows
+
+
+class ItemStore(_ColumnStore):
+    """
+    Columnar CDDA item table; rows read back as CddaItemView.
+    """
+
+    NUMERIC_FIELDS = ("weight", "volume", "price")
+    OBJECT_FIELDS = ("name", "materials", "recipes", "constituents", "physics")
+    QUANTITY_UNITS = QUANTITY_UNITS
+    VIEW = CddaItemView
+
+    @classmethod
+    def from_items(cls, items: Sequence[CddaItem], **kwargs) -> "ItemStore":
+        return cls._from_records([item.id for item in items], items, **kwargs)
+
+    def to_items(self) -> List[CddaItem]:
+        return [view.to_dataclass() for view in self]
+
+
+class MaterialStore(_ColumnStore):
+    """
+    Columnar Wikidata material table; rows read back as WikidataMaterialView.
+    """
+
+    NUMERIC_FIELDS = ("density", "melting_point", "tensile_strength", "thermal_conductivity")
+    OBJECT_FIELDS = ("label", "description", "aliases", "units", "flags")
+    VIEW = WikidataMaterialView
+
+    @classmethod
+    def from_materials(cls, materials: Sequence[WikidataMaterial], **kwargs) -> "MaterialStore":
+        return cls._from_records([m.qid for m in materials], materials, **kwargs)
+
+    def to_materials(self) -> List[WikidataMaterial]:
+        return [view.to_dataclass() for view in self]
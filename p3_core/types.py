@@ -20,6 +20,9 @@ class WikidataMaterial:
 
     embedding: Optional[List[float]] = None  # Filled on Day 2
 
+    units: Dict[str, str] = field(default_factory=dict)  # field -> Wikidata unit QID
+    flags: List[str] = field(default_factory=list)       # data-quality flags
+
 
 # -----------------------------------------
 # CDDA Item (Game-world item)
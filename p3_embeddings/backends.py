@@ -0,0 +1,105 @@
+import re
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class EmbeddingBackend(ABC):
+    """
+    What MiniLMEmbedder needs from a model: a stable name (used in cache
+    keys), encode() and dimension(). Backends load lazily.
+    """
+
+    name: str = "backend"
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def dimension(self) -> int:
+        ...
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    sentence-transformers model; torch is imported and the model loaded on
+    the first encode(), not at construction.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        self.name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer  # heavy: pulls in torch
+
+            self._model = SentenceTransformer(self.name)
+        return self._model
+
+    def encode(self, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=normalize,
+            show_progress_bar=False,
+        )
+        return np.asarray(embeddings)
+
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic feature-hashing embedder: lower-cased word tokens plus
+    character trigrams, each hashed to a signed bucket. No download, no
+    torch, identical output on every machine; meant for tests, benchmarks
+    and offline runs, not for match quality.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            bucket = (value % self.dim, 1.0 if (value >> 63) & 1 else -1.0)
+            self._buckets[feature] = bucket
+        return bucket
+
+    def _features(self, text: str) -> List[str]:
+        features: List[str] = []
+        for token in _TOKEN_RE.findall(text.lower()):
+            features.append(token)
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def encode(self, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                col, sign = self._bucket(feature)
+                embeddings[row, col] += sign
+
+        if normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings /= norms
+        return embeddings
+
+    def dimension(self) -> int:
+        return self.dim
@@ -0,0 +1,91 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+
+# Rough activation footprint of one token through a MiniLM-sized encoder
+# (384 hidden x 6 layers x float32, with headroom for attention/FFN buffers).
+BYTES_PER_TOKEN = 384 * 6 * 4 * 8
+
+# Share of currently available memory one batch may use.
+MEMORY_FRACTION = 0.25
+
+
+@dataclass
+class EncodeStats:
+    texts: int = 0
+    batches: int = 0
+    tokens: int = 0          # estimated, including padding
+    seconds: float = 0.0
+
+    @property
+    def texts_per_sec(self) -> float:
+        return self.texts / self.seconds if self.seconds > 0 else 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap word-piece count estimate (~4 characters per token, plus CLS/SEP).
+    """
+    return len(text) // 4 + 2
+
+
+def available_memory_bytes() -> Optional[int]:
+    """
+    MemAvailable from /proc/meminfo; None where that is not readable.
+    """
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def effective_token_budget(requested: int) -> int:
+    """
+    The requested per-batch token budget, lowered if available memory
+    cannot hold it.
+    """
+    available = available_memory_bytes()
+    if available is None:
+        return requested
+    return max(1, min(requested, int(available * MEMORY_FRACTION) // BYTES_PER_TOKEN))
+
+
+def plan_length_batches(
+    texts: Sequence[str],
+    token_budget: int,
+    max_batch_size: int,
+    max_tokens: int = 256,
+) -> List[List[int]]:
+    """
+    Groups text positions into batches of similar length.
+
+    Texts are sorted by estimated length, so each batch pads to a length
+    close to its members'. A batch grows while batch_size x longest
+    member stays within token_budget (and up to max_batch_size texts):
+    short names form large batches, long descriptions small ones.
+    Lengths are capped at max_tokens, the model's truncation length.
+    """
+    lengths = [min(estimate_tokens(t), max_tokens) for t in texts]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+
+    for i in order:
+        # sorted ascending, so the newest member is the longest
+        if current and (
+            len(current) >= max_batch_size
+            or (len(current) + 1) * lengths[i] > token_budget
+        ):
+            batches.append(current)
+            current = []
+        current.append(i)
+
+    if current:
+        batches.append(current)
+    return batches
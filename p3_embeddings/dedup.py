@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class DedupStats:
+    total: int
+    unique: int
+
+    @property
+    def dedup_ratio(self) -> float:
+        """
+        Share of texts that were duplicates and skipped encoding (0.0 - 1.0).
+        """
+        if self.total == 0:
+            return 0.0
+        return 1.0 - self.unique / self.total
+
+
+def embed_unique(embedder, texts: Sequence[str]) -> Tuple[List[np.ndarray], DedupStats]:
+    """
+    Encodes each distinct text once and hands every owner its row.
+
+    Works with any embedder exposing MiniLMEmbedder's embed(List[str]).
+    Owners of the same text share one (read-only by convention) row view,
+    so duplicates cost neither encoding time nor extra memory.
+    """
+    position: Dict[str, int] = {}
+    unique: List[str] = []
+    inverse: List[int] = []
+
+    for text in texts:
+        idx = position.setdefault(text, len(unique))
+        if idx == len(unique):
+            unique.append(text)
+        inverse.append(idx)
+
+    stats = DedupStats(total=len(texts), unique=len(unique))
+    if not unique:
+        return [], stats
+
+    vectors = embedder.embed(unique)
+    return [vectors[idx] for idx in inverse], stats
@@ -1,6 +1,11 @@
-from typing import List, Union
+import time
+from typing import List, Optional, Union
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from p3_embeddings import batching
+from p3_embeddings.backends import EmbeddingBackend, SentenceTransformerBackend
+from p3_embeddings.embedding_cache import EmbeddingCache
+from p3_embeddings.quantization import PRECISIONS, quantize
 
 
 class MiniLMEmbedder:
@@ -9,6 +14,9 @@ class MiniLMEmbedder:
 
     Uses sentence-transformers/all-MiniLM-L6-v2
     to convert text into dense vector embeddings.
+
+    The model is only imported and loaded on the first embed() that
+    misses the cache, so cached runs never pay for torch.
     """
 
     def __init__(
@@ -16,6 +24,11 @@ class MiniLMEmbedder:
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         normalize: bool = True,
         batch_size: int = 32,
+        cache: Optional[EmbeddingCache] = None,
+        precision: str = "float32",
+        backend: Optional[EmbeddingBackend] = None,
+        token_budget: Optional[int] = None,
+        max_batch_size: int = 512,
     ):
         """
         Parameters
@@ -25,14 +38,52 @@ class MiniLMEmbedder:
         normalize : bool
             Whether to L2-normalize embeddings (recommended for cosine similarity).
         batch_size : int
-            Batch size for embedding large datasets.
+            Batch size for embedding large datasets. Used as-is when
+            token_budget is 0; otherwise only sets the default budget.
+        cache : EmbeddingCache, optional
+            Persistent cache; only texts it has never seen are encoded.
+        precision : str
+            Output precision: "float32", "float16" or "int8" (per-vector
+            scaled, requires normalize=True).
+        backend : EmbeddingBackend, optional
+            Encoder to use instead of the sentence-transformers model,
+            e.g. HashingBackend for runs without a model download.
+        token_budget : int, optional
+            Padded tokens per batch for the length-bucketed scheduler
+            (default batch_size x 256, lowered to fit available memory).
+            0 disables the scheduler.
+        max_batch_size : int
+            Upper bound on texts per scheduled batch.
         """
-        self.model_name = model_name
+        if precision not in PRECISIONS:
+            raise ValueError(f"unknown precision {precision!r}, expected one of {PRECISIONS}")
+        if precision == "int8" and not normalize:
+            raise ValueError("int8 embeddings require normalize=True")
+
+        self.backend = backend or SentenceTransformerBackend(model_name)
+        self.model_name = self.backend.name
         self.normalize = normalize
         self.batch_size = batch_size
+        self.cache = cache
+        self.precision = precision
+        self.token_budget = batch_size * 256 if token_budget is None else token_budget
+        self.max_batch_size = max_batch_size
 
-        # Load model once
-        self.model = SentenceTransformer(model_name)
+        # throughput of the last embed() call that reached the model
+        self.stats = batching.EncodeStats()
+
+    @property
+    def model(self):
+        """
+        The underlying sentence-transformers model (loaded on first access).
+        Backends without one, such as HashingBackend, raise AttributeError.
+        """
+        if not isinstance(self.backend, SentenceTransformerBackend):
+            raise AttributeError(
+                f"{type(self.backend).__name__} ({self.backend.name}) has no "
+                "sentence-transformers model"
+            )
+        return self.backend.model
 
     def embed(
         self,
@@ -52,21 +103,81 @@ class MiniLMEmbedder:
             Embedding vector(s) with shape:
             - (dim,) for single string
             - (n, dim) for list
+            dtype follows `precision`.
         """
         if isinstance(texts, str):
             texts = [texts]
 
-        embeddings = self.model.encode(
-            texts,
-            batch_size=self.batch_size,
-            normalize_embeddings=self.normalize,
-            show_progress_bar=False,
-        )
+        embeddings = self._embed_float(texts)
+        if self.precision == "float32" or embeddings.ndim != 2:
+            return embeddings
+        return quantize(embeddings, self.precision)
+
+    def _embed_float(self, texts: List[str]) -> np.ndarray:
+        """
+        float32 embeddings, served from the cache where possible.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return self._encode(texts)
+
+        keys = [EmbeddingCache.key(self.model_name, self.normalize, t) for t in texts]
+        found, cached = self.cache.get_many(keys)
+        if len(found) == len(texts):
+            return cached
 
-        return np.asarray(embeddings)
+        hit = set(found)
+        missing = [i for i in range(len(texts)) if i not in hit]
+        encoded = self._encode([texts[i] for i in missing])
+
+        self.cache.put_many([keys[i] for i in missing], encoded)
+        self.cache.save()
+
+        embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        embeddings[missing] = encoded
+        if found:
+            embeddings[found] = cached
+        return embeddings
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Runs the backend over length-bucketed batches and restores input order.
+        """
+        start = time.perf_counter()
+
+        if not self.token_budget:
+            embeddings = self.backend.encode(texts, self.batch_size, self.normalize)
+            self.stats = batching.EncodeStats(
+                texts=len(texts),
+                batches=-(-len(texts) // self.batch_size),
+                seconds=time.perf_counter() - start,
+            )
+            return np.asarray(embeddings)
+
+        budget = batching.effective_token_budget(self.token_budget)
+        plan = batching.plan_length_batches(texts, budget, self.max_batch_size)
+
+        embeddings: Optional[np.ndarray] = None
+        tokens = 0
+        for batch in plan:
+            batch_texts = [texts[i] for i in batch]
+            encoded = np.asarray(self.backend.encode(batch_texts, len(batch), self.normalize))
+            if embeddings is None:
+                embeddings = np.empty((len(texts), encoded.shape[1]), dtype=encoded.dtype)
+            embeddings[batch] = encoded
+            tokens += len(batch) * min(batching.estimate_tokens(batch_texts[-1]), 256)
+
+        self.stats = batching.EncodeStats(
+            texts=len(texts),
+            batches=len(plan),
+            tokens=tokens,
+            seconds=time.perf_counter() - start,
+        )
+        return embeddings
 
     def embedding_dim(self) -> int:
         """
         Returns embedding dimensionality.
         """
-        return self.model.get_sentence_embedding_dimension()
+        return self.backend.dimension()
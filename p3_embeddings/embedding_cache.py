@@ -0,0 +1,161 @@
+import os
+import json
+import heapq
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent text -> embedding cache shared across pipeline runs.
+
+    Vectors live in one memory-mapped float32 file (vectors.npy); index.json
+    maps each key to its row plus a last-used tick. Once max_entries is
+    reached the least recently used rows are evicted and reused.
+
+    Evicted rows are dropped from index.json before they are overwritten,
+    so a crash mid-put never leaves a key pointing at another text's vector.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 500_000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(cache_dir, "vectors.npy")
+        self.index_path = os.path.join(cache_dir, "index.json")
+
+        self.dim: Optional[int] = None
+        self.clock = 0
+        self.entries: Dict[str, List[int]] = {}   # key -> [row, last_used]
+        self._vectors: Optional[np.ndarray] = None
+        self._free: List[int] = []                # unused rows, popped from the end
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._read()
+
+    # ------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------
+    @staticmethod
+    def key(model_name: str, normalize: bool, text: str) -> str:
+        payload = f"{model_name}\0{int(normalize)}\0{text}".encode("utf-8")
+        return hashlib.sha1(payload).hexdigest()
+
+    # ------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------
+    def _read(self) -> None:
+        if not (os.path.exists(self.index_path) and os.path.exists(self.vectors_path)):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            vectors = np.load(self.vectors_path, mmap_mode="r+")
+        except Exception:
+            return
+
+        self.dim = stored["dim"]
+        self.clock = stored["clock"]
+        self.entries = stored["entries"]
+        self._vectors = vectors
+
+        used = {row for row, _ in self.entries.values()}
+        self._free = [r for r in reversed(range(self._capacity())) if r not in used]
+
+    def _capacity(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def _resize(self, capacity: int) -> None:
+        tmp_path = self.vectors_path + ".tmp.npy"
+        vectors = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+        if self._vectors is not None:
+            vectors[: self._capacity()] = self._vectors
+            del self._vectors
+        vectors.flush()
+        del vectors
+
+        os.replace(tmp_path, self.vectors_path)
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def _free_rows(self, needed: int) -> List[int]:
+        """
+        Returns `needed` unused rows, growing the file or evicting LRU entries.
+        Evictions are saved to index.json before the rows are handed out.
+        """
+        if len(self._free) < needed and self._capacity() < self.max_entries:
+            old = self._capacity()
+            grown = min(self.max_entries, max(old * 2, old + needed - len(self._free), 1024))
+            self._resize(grown)
+            self._free[:0] = reversed(range(old, grown))
+
+        if len(self._free) < needed:
+            evict = heapq.nsmallest(
+                needed - len(self._free), self.entries.items(), key=lambda kv: kv[1][1]
+            )
+            for key, (row, _) in evict:
+                del self.entries[key]
+                self._free.append(row)
+            self.save()
+
+        rows = self._free[len(self._free) - needed:][::-1]
+        del self._free[len(self._free) - needed:]
+        return rows
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_many(self, keys: Sequence[str]) -> Tuple[List[int], Optional[np.ndarray]]:
+        """
+        Returns (positions of keys that were found, their vectors stacked).
+        """
+        self.clock += 1
+        found: List[int] = []
+        rows: List[int] = []
+
+        for pos, key in enumerate(keys):
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry[1] = self.clock
+                found.append(pos)
+                rows.append(entry[0])
+
+        if not found:
+            return [], None
+        return found, np.array(self._vectors[rows])
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"cache in {self.cache_dir} holds {self.dim}-d vectors, got {vectors.shape[1]}-d"
+            )
+
+        # keep only the last vector per key, and at most max_entries of them
+        latest = {key: i for i, key in enumerate(keys)}
+        todo = [(k, i) for k, i in latest.items() if k not in self.entries]
+        todo = todo[-self.max_entries:]
+
+        self.clock += 1
+        rows = self._free_rows(len(todo))
+        for (key, i), row in zip(todo, rows):
+            self._vectors[row] = vectors[i]
+            self.entries[key] = [row, self.clock]
+
+    def save(self) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "clock": self.clock, "entries": self.entries}, f)
+        os.replace(tmp_path, self.index_path)
@@ -1,14 +1,20 @@
 import numpy as np
 from typing import List, Tuple
 
+from p3_embeddings.quantization import as_float
+
 
 def cosine_similarity(vec_a: np.ndarray, vec_b: np.ndarray) -> float:
     """
     Compute cosine similarity between two vectors.
+    float16 / int8 inputs are computed in float32.
     """
     if vec_a is None or vec_b is None:
         return 0.0
 
+    vec_a = as_float(vec_a)
+    vec_b = as_float(vec_b)
+
     norm_a = np.linalg.norm(vec_a)
     norm_b = np.linalg.norm(vec_b)
 
@@ -25,9 +31,10 @@ def cosine_similarity_matrix(
     """
     Compute full cosine similarity matrix:
     shape = (len(source), len(target))
+    float16 / int8 inputs are computed in float32.
     """
-    source = np.stack(source_embeddings)
-    target = np.stack(target_embeddings)
+    source = as_float(np.stack(source_embeddings))
+    target = as_float(np.stack(target_embeddings))
 
     source_norm = source / np.linalg.norm(source, axis=1, keepdims=True)
     target_norm = target / np.linalg.norm(target, axis=1, keepdims=True)
@@ -44,13 +51,257 @@ def top_k_similar(
     """
     Return top-k most similar candidates above threshold.
     candidates = [(id, embedding), ...]
+    Scored in one matrix product; ties keep candidate order.
+    """
+    if not candidates or k <= 0:
+        return []
+
+    present = [i for i, (_, emb) in enumerate(candidates) if emb is not None]
+    scores = np.zeros(len(candidates))
+    if query_embedding is not None and present:
+        target = as_float(np.stack([np.asarray(candidates[i][1]) for i in present]))
+        query = as_float(np.asarray(query_embedding))[None, :]
+        scores[present] = _block_scores(
+            query, target, np.linalg.norm(query, axis=1), np.linalg.norm(target, axis=1)
+        )[0]
+
+    keep = np.flatnonzero(scores >= threshold)
+    if len(keep) == 0:
+        return []
+    cols = _select_top_k(scores[keep][None, :], k)[0]
+    return [(candidates[keep[c]][0], float(scores[keep[c]])) for c in cols]
+
+
+def _select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column positions of the k best scores per row, best first, with ties
+    going to the lower column. Uses a partial selection (argpartition)
+    instead of sorting whole rows; only the k winners get sorted.
+    """
+    n, width = scores.shape
+    k = min(k, width)
+    if k == 0:
+        return np.zeros((n, 0), dtype=np.int64)
+
+    if k < width:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        kth = scores[np.arange(n)[:, None], part].min(axis=1, keepdims=True)
+
+        # everything above the k-th score, then the lowest columns tied with it
+        above = scores > kth
+        tied = scores == kth
+        need = k - above.sum(axis=1, keepdims=True)
+        chosen = above | (tied & (np.cumsum(tied, axis=1) <= need))
+        cols = np.nonzero(chosen)[1].reshape(n, k)
+    else:
+        cols = np.broadcast_to(np.arange(width), (n, width))
+
+    order = np.argsort(-np.take_along_axis(scores, cols, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(cols, order, axis=1)
+
+
+def top_k_matches(
+    source: np.ndarray,
+    target: np.ndarray,
+    k: int = 5,
+    block_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every source row, the k target rows with the highest cosine
+    similarity, best first (ties: lower target index first), scored block
+    by block and kept as a running top-k, so no row is ever fully sorted.
+
+    The first column is what best_matches gives: rows whose leader is
+    within float noise of the runner-up (or of 0) are re-decided per pair,
+    and the leading score is cosine_similarity's own value.
+
+    Returns (indices, scores), both shaped (len(source), k); slots beyond
+    len(target) are -1 / -inf.
+    """
+    src = as_float(source)
+    tgt = as_float(target)
+    n, m = src.shape[0], tgt.shape[0]
+
+    top_idx = np.full((n, k), -1, dtype=np.int64)
+    top_score = np.full((n, k), -np.inf)
+    if n == 0 or m == 0 or k <= 0:
+        return top_idx, top_score
+
+    # one spare column so a near-tie for first place is always visible
+    width_k = max(k, 2)
+    top_idx = np.full((n, width_k), -1, dtype=np.int64)
+    top_score = np.full((n, width_k), -np.inf)
+
+    src_norm = np.linalg.norm(src, axis=1)
+    tgt_norm = np.linalg.norm(tgt, axis=1)
+
+    for s0 in range(0, n, block_size):
+        s1 = min(n, s0 + block_size)
+        run_idx = np.zeros((s1 - s0, 0), dtype=np.int64)
+        run_score = np.zeros((s1 - s0, 0))
+
+        for t0 in range(0, m, block_size):
+            t1 = min(m, t0 + block_size)
+            scores = _block_scores(src[s0:s1], tgt[t0:t1], src_norm[s0:s1], tgt_norm[t0:t1])
+
+            # the running top-k is kept in index order, so merged columns
+            # stay in ascending target index and ties resolve correctly
+            merged_idx = np.hstack([run_idx, np.broadcast_to(np.arange(t0, t1), scores.shape)])
+            merged_score = np.hstack([run_score, scores])
+            cols = np.sort(_select_top_k(merged_score, width_k), axis=1)
+            run_idx = np.take_along_axis(merged_idx, cols, axis=1)
+            run_score = np.take_along_axis(merged_score, cols, axis=1)
+
+        order = np.argsort(-run_score, axis=1, kind="stable")
+        width = run_idx.shape[1]
+        top_idx[s0:s1, :width] = np.take_along_axis(run_idx, order, axis=1)
+        top_score[s0:s1, :width] = np.take_along_axis(run_score, order, axis=1)
+
+    tol = _tie_tolerance(np.result_type(src.dtype, tgt.dtype))
+    ambiguous = (top_score[:, 0] <= tol) | (top_score[:, 1] >= top_score[:, 0] - tol)
+    for i in range(n):
+        if ambiguous[i]:
+            _recheck_top(src, tgt, src_norm, tgt_norm, i, top_idx[i], top_score[i], tol, block_size)
+        else:
+            top_score[i, 0] = cosine_similarity(source[i], target[top_idx[i, 0]])
+
+    return top_idx[:, :k], top_score[:, :k]
+
+
+def _recheck_top(
+    src: np.ndarray,
+    tgt: np.ndarray,
+    src_norm: np.ndarray,
+    tgt_norm: np.ndarray,
+    i: int,
+    row_idx: np.ndarray,
+    row_score: np.ndarray,
+    tol: float,
+    block_size: int,
+) -> None:
+    """
+    Re-ranks one top-k row in place on per-pair scores, with best_matches'
+    winner first (when there is one) and the rest by score, then index.
+    """
+    best, _ = _exact_best(src, tgt, src_norm, tgt_norm, i, tol, block_size)
+    candidates = {int(j) for j in row_idx if j >= 0}
+    if best >= 0:
+        candidates.add(best)
+
+    exact = {j: cosine_similarity(src[i], tgt[j]) for j in candidates}
+    ranked = sorted(candidates, key=lambda j: (j != best, -exact[j], j))[: len(row_idx)]
+    row_idx[: len(ranked)] = ranked
+    row_score[: len(ranked)] = [exact[j] for j in ranked]
+
+
+def _tie_tolerance(dtype: np.dtype) -> float:
     """
-    scores = []
+    How far a blocked matrix-product score may drift from the per-pair
+    cosine_similarity value (different summation order).
+    """
+    return 1e-12 if dtype == np.float64 else 1e-5
+
+
+def best_matches(
+    source: np.ndarray,
+    target: np.ndarray,
+    block_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every source row, the target row with the highest cosine similarity,
+    scored block by block with one matrix product per (source, target) block.
+
+    Gives exactly what a per-pair loop over cosine_similarity gives: the
+    first target with the strictly highest score, and only if that score
+    is > 0. Rows whose winner is within float noise of another candidate
+    (or of 0) are re-decided with cosine_similarity on just those
+    candidates. The returned score is always cosine_similarity's own value.
+
+    Returns (best target index per source row or -1, best score or 0.0).
+    """
+    src = as_float(source)
+    tgt = as_float(target)
+    n, m = src.shape[0], tgt.shape[0]
+    if n == 0 or m == 0:
+        return np.full(n, -1, dtype=np.int64), np.zeros(n)
+    tol = _tie_tolerance(np.result_type(src.dtype, tgt.dtype))
+
+    src_norm = np.linalg.norm(src, axis=1)
+    tgt_norm = np.linalg.norm(tgt, axis=1)
+
+    best_idx = np.full(n, -1, dtype=np.int64)
+    best_score = np.zeros(n)
+    ambiguous = np.zeros(n, dtype=bool)
 
-    for cid, emb in candidates:
-        score = cosine_similarity(query_embedding, emb)
-        if score >= threshold:
-            scores.append((cid, score))
+    for s0 in range(0, n, block_size):
+        s1 = min(n, s0 + block_size)
+        rows = np.arange(s1 - s0)
+        run_max = np.full(s1 - s0, -np.inf)
+        run_idx = np.full(s1 - s0, -1, dtype=np.int64)
+        run_ambiguous = np.zeros(s1 - s0, dtype=bool)
+
+        for t0 in range(0, m, block_size):
+            t1 = min(m, t0 + block_size)
+            scores = _block_scores(src[s0:s1], tgt[t0:t1], src_norm[s0:s1], tgt_norm[t0:t1])
+
+            block_arg = scores.argmax(axis=1)
+            block_max = scores[rows, block_arg]
+            near = (scores >= (block_max - tol)[:, None]).sum(axis=1) > 1
+
+            better = block_max > run_max + tol
+            close = ~better & (block_max >= run_max - tol)
+
+            run_ambiguous = np.where(better, near, run_ambiguous | close)
+            run_idx = np.where(better, block_arg + t0, run_idx)
+            run_max = np.where(better, block_max, run_max)
+
+        run_ambiguous |= run_max <= tol
+        best_idx[s0:s1] = run_idx
+        ambiguous[s0:s1] = run_ambiguous
+
+    for i in range(n):
+        if ambiguous[i]:
+            best_idx[i], best_score[i] = _exact_best(src, tgt, src_norm, tgt_norm, i, tol, block_size)
+        elif best_idx[i] >= 0:
+            best_score[i] = cosine_similarity(source[i], target[best_idx[i]])
+
+    return best_idx, best_score
+
+
+def _block_scores(
+    src: np.ndarray,
+    tgt: np.ndarray,
+    src_norm: np.ndarray,
+    tgt_norm: np.ndarray,
+) -> np.ndarray:
+    denom = np.outer(src_norm, tgt_norm)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = (src @ tgt.T) / denom
+    scores[denom == 0] = 0.0
+    return scores
+
+
+def _exact_best(
+    src: np.ndarray,
+    tgt: np.ndarray,
+    src_norm: np.ndarray,
+    tgt_norm: np.ndarray,
+    i: int,
+    tol: float,
+    block_size: int,
+) -> Tuple[int, float]:
+    """
+    Per-pair decision for one source row, over the near-best candidates only.
+    """
+    scores = np.concatenate([
+        _block_scores(src[i:i + 1], tgt[t0:t0 + block_size], src_norm[i:i + 1], tgt_norm[t0:t0 + block_size])[0]
+        for t0 in range(0, tgt.shape[0], block_size)
+    ])
+    candidates = np.flatnonzero(scores >= scores.max() - tol)
 
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores[:k]
+    best, best_score = -1, 0.0
+    for j in candidates:
+        score = cosine_similarity(src[i], tgt[j])
+        if score > best_score:
+            best, best_score = int(j), score
+    return best, best_score
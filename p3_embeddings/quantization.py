@@ -0,0 +1,72 @@
+import numpy as np
+
+
+# float32 is the model's native output; the others trade precision for memory.
+PRECISIONS = ("float32", "float16", "int8")
+
+
+def quantize(matrix: np.ndarray, precision: str = "float32") -> np.ndarray:
+    """
+    Stores embeddings at reduced precision.
+
+    int8 scales every vector by its own max |value| onto [-127, 127]. The
+    scale itself is not kept: cosine similarity does not depend on it, and
+    for L2-normalized embeddings dequantize() recovers it from the codes.
+    """
+    matrix = np.asarray(matrix)
+
+    if precision == "float32":
+        return matrix.astype(np.float32, copy=False)
+    if precision == "float16":
+        return matrix.astype(np.float16)
+    if precision != "int8":
+        raise ValueError(f"unknown precision {precision!r}, expected one of {PRECISIONS}")
+
+    if matrix.dtype == np.int8:
+        return matrix
+    values = matrix.astype(np.float32, copy=False)
+    peak = np.max(np.abs(values), axis=-1, keepdims=True)
+    peak[peak == 0] = 1.0
+    return np.round(values * (127.0 / peak)).astype(np.int8)
+
+
+def as_float(matrix: np.ndarray) -> np.ndarray:
+    """
+    float16 / int8 -> float32 for arithmetic (int8 products would overflow,
+    float16 sums lose precision); float32 / float64 pass through unchanged.
+    """
+    matrix = np.asarray(matrix)
+    if matrix.dtype in (np.float32, np.float64):
+        return matrix
+    return matrix.astype(np.float32)
+
+
+def dequantize(matrix: np.ndarray) -> np.ndarray:
+    """
+    Back to float32 unit vectors (for embeddings that were L2-normalized).
+    """
+    values = as_float(matrix).astype(np.float32, copy=False)
+    norms = np.linalg.norm(values, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return values / norms
+
+
+def recall_at_k(
+    queries: np.ndarray,
+    targets: np.ndarray,
+    precision: str,
+    k: int = 1,
+) -> float:
+    """
+    Fraction of the exact float32 top-k targets per query that are still
+    in the top-k when both sides are stored at `precision`.
+    """
+    exact = dequantize(queries) @ dequantize(targets).T
+    approx = dequantize(quantize(queries, precision)) @ dequantize(quantize(targets, precision)).T
+
+    k = min(k, targets.shape[0])
+    exact_top = np.argpartition(-exact, k - 1, axis=1)[:, :k]
+    approx_top = np.argpartition(-approx, k - 1, axis=1)[:, :k]
+
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact_top, approx_top))
+    return hits / float(exact_top.size)
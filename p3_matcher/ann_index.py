@@ -0,0 +1,207 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from p3_embeddings.quantization import as_float
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(as_float(vectors), dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index for cosine similarity.
+
+    Vectors are L2-normalized and clustered with spherical k-means into
+    n_lists cells. A query scans only the n_probe cells whose centroids
+    are closest, so n_probe trades recall (higher) for speed (lower);
+    n_probe = n_lists is an exact search.
+    """
+
+    def __init__(self, centroids: np.ndarray, n_probe: int = 8):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.n_probe = n_probe
+
+        dim = self.centroids.shape[1]
+        self.ids: List[str] = []
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.assign = np.zeros(0, dtype=np.int64)
+        self.lists: List[np.ndarray] = [
+            np.zeros(0, dtype=np.int64) for _ in range(len(self.centroids))
+        ]
+
+    # ------------------------------------------------------------
+    # Build / add
+    # ------------------------------------------------------------
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        Trains centroids on `vectors` and adds them.
+        n_lists defaults to ~sqrt(len(vectors)).
+        """
+        data = _normalize(vectors)
+        n = data.shape[0]
+        if n == 0:
+            raise ValueError("cannot build an index from zero vectors")
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(n, size=n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=n_lists)
+
+            empty = counts == 0
+            if empty.any():
+                # re-seed empty cells with random points
+                sums[empty] = data[rng.choice(n, size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        index = cls(centroids, n_probe=n_probe)
+        index.add(ids, data)
+        return index
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Adds vectors to their nearest cells (no retraining).
+        """
+        data = _normalize(vectors)
+        if len(ids) != data.shape[0]:
+            raise ValueError("ids and vectors differ in length")
+
+        start = len(self.ids)
+        assign = np.argmax(data @ self.centroids.T, axis=1)
+
+        self.ids.extend(ids)
+        self.vectors = np.concatenate([self.vectors, data])
+        self.assign = np.concatenate([self.assign, assign])
+
+        rows = np.arange(start, start + len(ids))
+        for cell in np.unique(assign):
+            self.lists[cell] = np.concatenate([self.lists[cell], rows[assign == cell]])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------
+    def query(
+        self,
+        queries: np.ndarray,
+        k: int = 1,
+        n_probe: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k rows by cosine similarity.
+
+        Returns (rows, scores), both shaped (n_queries, k), best first;
+        ties keep insertion order. Missing slots are -1 / -inf.
+        """
+        data = _normalize(queries)
+        n_probe = min(len(self.centroids), n_probe or self.n_probe)
+
+        rows = np.full((data.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((data.shape[0], k), -np.inf)
+
+        cells = np.argsort(-(data @ self.centroids.T), axis=1, kind="stable")[:, :n_probe]
+        for q, probe in enumerate(cells):
+            candidates = np.sort(np.concatenate([self.lists[c] for c in probe]))
+            if len(candidates) == 0:
+                continue
+
+            cand_scores = self.vectors[candidates] @ data[q]
+            top = min(k, len(candidates))
+            order = np.lexsort((candidates, -cand_scores))[:top]
+            rows[q, :top] = candidates[order]
+            scores[q, :top] = cand_scores[order]
+
+        return rows, scores
+
+    def query_ids(self, queries: np.ndarray, k: int = 1, n_probe: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        rows, scores = self.query(queries, k, n_probe)
+        return [
+            [(self.ids[r], float(s)) for r, s in zip(row, score) if r >= 0]
+            for row, score in zip(rows, scores)
+        ]
+
+    # ------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------
+    @staticmethod
+    def _npz_path(path: str) -> str:
+        return path if path.endswith(".npz") else path + ".npz"
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to path (".npz" is appended if missing); ids are
+        stored as a fixed-width string array so load() needs no pickle.
+        """
+        np.savez(
+            self._npz_path(path),
+            centroids=self.centroids,
+            vectors=self.vectors,
+            assign=self.assign,
+            ids=np.array(self.ids, dtype=str),
+            n_probe=self.n_probe,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(cls._npz_path(path), allow_pickle=False) as stored:
+            index = cls(stored["centroids"], n_probe=int(stored["n_probe"]))
+            index.ids = [str(i) for i in stored["ids"]]
+            index.vectors = stored["vectors"]
+            index.assign = stored["assign"]
+
+        for cell in range(len(index.centroids)):
+            index.lists[cell] = np.flatnonzero(index.assign == cell)
+        return index
+
+
+def recall_report(
+    index: IVFIndex,
+    queries: np.ndarray,
+    k: int = 10,
+    n_probes: Sequence[int] = (1, 2, 4, 8, 16),
+) -> Dict[int, Dict[str, float]]:
+    """
+    Recall@k of the index against exact search over the same vectors, and
+    the share of vectors scanned per query, for each n_probe setting.
+    """
+    data = _normalize(queries)
+    exact_scores = data @ index.vectors.T
+    k = min(k, len(index))
+    exact = np.argsort(-exact_scores, axis=1, kind="stable")[:, :k]
+
+    report: Dict[int, Dict[str, float]] = {}
+    for n_probe in n_probes:
+        n_probe = min(n_probe, len(index.centroids))
+        rows, _ = index.query(data, k, n_probe)
+        hits = sum(len(set(e) & set(r[r >= 0])) for e, r in zip(exact, rows))
+
+        cells = np.argsort(-(data @ index.centroids.T), axis=1)[:, :n_probe]
+        scanned = np.mean([sum(len(index.lists[c]) for c in probe) for probe in cells])
+
+        report[n_probe] = {
+            "recall": hits / float(exact.size),
+            "scanned": scanned / float(len(index)),
+        }
+    return report
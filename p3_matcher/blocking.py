@@ -0,0 +1,95 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def lexical_keys(texts: Iterable[Optional[str]]) -> Set[str]:
+    """
+    Lower-cased word tokens ("t:iron") and their character trigrams
+    ("g:iro", "g:ron"). Ids are split on "_", so "scrap_iron" and
+    "iron" share "t:iron".
+    """
+    keys: Set[str] = set()
+    for text in texts:
+        for token in _TOKEN_RE.findall((text or "").lower()):
+            keys.add("t:" + token)
+            for i in range(len(token) - 2):
+                keys.add("g:" + token[i:i + 3])
+    return keys
+
+
+def item_keys(item: Any) -> Set[str]:
+    """
+    CDDA side: id, name and material tags.
+    """
+    return lexical_keys([item.id, item.name] + list(item.materials or []))
+
+
+def material_keys(material: Any) -> Set[str]:
+    """
+    Wikidata side: label and aliases.
+    """
+    return lexical_keys([material.label] + list(material.aliases or []))
+
+
+@dataclass
+class BlockingStats:
+    materials: int = 0
+    items: int = 0
+    pairs_scored: int = 0
+    fallbacks: int = 0           # materials scored in full (no or too many candidates)
+    recall: Optional[float] = None   # share of exact best matches kept (if measured)
+
+    @property
+    def pairs_total(self) -> int:
+        return self.materials * self.items
+
+    @property
+    def pruning_rate(self) -> float:
+        return 1.0 - self.pairs_scored / self.pairs_total if self.pairs_total else 0.0
+
+    @property
+    def recall_loss(self) -> Optional[float]:
+        return None if self.recall is None else 1.0 - self.recall
+
+
+class BlockingIndex:
+    """
+    Inverted index from lexical keys to CDDA item rows.
+
+    An item is a candidate for a material when they share a whole token,
+    or at least min_trigrams character trigrams (which catches
+    "aluminium" / "aluminum" and similar spelling variants).
+    """
+
+    def __init__(self, items: Sequence[Any], min_trigrams: int = 2):
+        self.n_items = len(items)
+        self.min_trigrams = min_trigrams
+
+        postings: Dict[str, List[int]] = {}
+        for row, item in enumerate(items):
+            for key in item_keys(item):
+                postings.setdefault(key, []).append(row)
+        self.postings: Dict[str, np.ndarray] = {
+            key: np.array(rows, dtype=np.int64) for key, rows in postings.items()
+        }
+
+    def candidates(self, keys: Set[str]) -> np.ndarray:
+        """
+        Candidate item rows for a material's keys, in ascending row order.
+        """
+        token_rows = [self.postings[k] for k in keys if k[0] == "t" and k in self.postings]
+        gram_rows = [self.postings[k] for k in keys if k[0] == "g" and k in self.postings]
+
+        hit = np.zeros(self.n_items, dtype=bool)
+        if token_rows:
+            hit[np.concatenate(token_rows)] = True
+        if gram_rows:
+            counts = np.bincount(np.concatenate(gram_rows), minlength=self.n_items)
+            hit |= counts >= self.min_trigrams
+        return np.flatnonzero(hit)
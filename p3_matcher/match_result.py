@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import List
 
 
 @dataclass
@@ -7,3 +8,22 @@ class MatchResult:
     cdda_id: str
     confidence_score: float
     review_needed: bool
+
+
+@dataclass(frozen=True)
+class MaterialCandidate:
+    """
+    One ranked Wikidata material for a free-text query.
+    """
+    wikidata_id: str
+    confidence_score: float
+    review_needed: bool
+
+
+@dataclass
+class QueryResult:
+    """
+    A free-text query paired with its ranked candidates (best first).
+    """
+    query: str
+    matches: List[MaterialCandidate]
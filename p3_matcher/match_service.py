@@ -0,0 +1,324 @@
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from p3_core.types import WikidataMaterial
+from p3_embeddings.embedder import MiniLMEmbedder
+from p3_embeddings.matcher_utils import top_k_matches
+from p3_matcher.match_result import MaterialCandidate, QueryResult
+from p3_matcher.material_matcher import embedding_matrix
+
+
+class QueryCache:
+    """
+    LRU cache of (query text, k) -> ranked candidates.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, int], List[MaterialCandidate]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int]) -> Optional[List[MaterialCandidate]]:
+        found = self.entries.get(key)
+        if found is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return found
+
+    def put(self, key: Tuple[str, int], results: List[MaterialCandidate]) -> None:
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class LatencyTracker:
+    """
+    Latencies of the most recent queries, for p50 / p99 reporting.
+    Safe to record from several threads while another reports.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        # the embedder (and its on-disk cache) is not thread-safe
+        self._embed_lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def report(self) -> Dict[str, float]:
+        with self._lock:
+            snapshot = list(self.samples)
+        if not snapshot:
+            return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0}
+        ms = np.array(snapshot) * 1e3
+        return {
+            "count": len(ms),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+        }
+
+
+class MatchService:
+    """
+    Long-lived "which Wikidata material is this?" service.
+
+    Material embeddings are normalized once and kept in memory with the
+    embedder, so a query only embeds its own text. Queries submitted
+    one at a time are collected into micro-batches (up to max_batch, or
+    whatever arrives within max_wait_ms) and embedded and scored
+    together; repeated queries are served from an LRU cache. Calls into
+    the embedder are serialized, so match_many() and match() may be used
+    from any number of threads.
+    """
+
+    def __init__(
+        self,
+        embedder: MiniLMEmbedder,
+        materials: List[WikidataMaterial],
+        k: int = 5,
+        threshold: float = 0.85,
+        cache_size: int = 10_000,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        """
+        materials: Wikidata materials that already carry embeddings
+                   (see WikidataMaterialsClient.embed_materials)
+        k: default number of ranked materials per query
+        threshold: matches scoring below it are flagged review_needed
+        """
+        self.embedder = embedder
+        self.k = k
+        self.threshold = threshold
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+
+        matrix, self.materials = embedding_matrix(materials)
+        if not self.materials:
+            raise ValueError("MatchService needs at least one embedded material")
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+
+        self.cache = QueryCache(cache_size)
+        self.latency = LatencyTracker()
+        self._lock = threading.Lock()
+        # the embedder (and its on-disk cache) is not thread-safe
+        self._embed_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple[str, int, Future, float]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------
+    # Batch API
+    # ------------------------------------------------------------
+    def match_many(self, texts: List[str], k: Optional[int] = None) -> List[QueryResult]:
+        """
+        Ranked materials for each text (best first, only scores > 0), one
+        QueryResult per text in input order.
+        Cache misses are embedded and scored in one batch.
+        """
+        start = time.perf_counter()
+        results = self._match(texts, k or self.k)
+        elapsed = time.perf_counter() - start
+        for _ in texts:
+            self.latency.record(elapsed)
+        return results
+
+    def _match(self, texts: List[str], k: int) -> List[QueryResult]:
+        results: List[Optional[List[MaterialCandidate]]] = [None] * len(texts)
+        with self._lock:
+            for i, text in enumerate(texts):
+                results[i] = self.cache.get((text, k))
+
+        missing = sorted({t for t, r in zip(texts, results) if r is None})
+        if missing:
+            with self._embed_lock:
+                vectors = np.asarray(self.embedder.embed(missing), dtype=np.float32)
+                top_idx, top_score = top_k_matches(vectors, self.matrix, k)
+
+            computed = {}
+            for text, row_idx, row_score in zip(missing, top_idx, top_score):
+                computed[text] = [
+                    MaterialCandidate(
+                        wikidata_id=self.materials[j].qid,
+                        confidence_score=float(s),
+                        review_needed=bool(s < self.threshold),
+                    )
+                    for j, s in zip(row_idx, row_score)
+                    if j >= 0 and s > 0
+                ]
+            with self._lock:
+                for text, found in computed.items():
+                    self.cache.put((text, k), found)
+            results = [computed[t] if r is None else r for t, r in zip(texts, results)]
+
+        return [QueryResult(text, list(r)) for text, r in zip(texts, results)]
+
+    # ------------------------------------------------------------
+    # Micro-batched single queries
+    # ------------------------------------------------------------
+    def start(self) -> "MatchService":
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="match-service", daemon=True)
+            self._worker.start()
+        return self
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self) -> "MatchService":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def submit(self, text: str, k: Optional[int] = None) -> Future:
+        """
+        Queues one query; the future resolves to its QueryResult.
+        """
+        self.start()
+        future: Future = Future()
+        self._queue.put((text, k or self.k, future, time.perf_counter()))
+        return future
+
+    def match(self, text: str, k: Optional[int] = None, timeout: Optional[float] = None) -> QueryResult:
+        return self.submit(text, k).result(timeout)
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            batch = [request]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+
+            self._answer(batch)
+            if stop:
+                return
+
+    def _answer(self, batch: List[Tuple[str, int, Future, float]]) -> None:
+        by_k: Dict[int, List[Tuple[str, int, Future, float]]] = {}
+        for request in batch:
+            by_k.setdefault(request[1], []).append(request)
+
+        for k, requests in by_k.items():
+            try:
+                results = self._match([r[0] for r in requests], k)
+            except Exception as e:
+                for _, _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            for (_, _, future, submitted), found in zip(requests, results):
+                self.latency.record(done - submitted)
+                future.set_result(found)
+
+    # ------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = dict(self.latency.report())
+        report.update(
+            cache_entries=len(self.cache),
+            cache_hits=self.cache.hits,
+            cache_misses=self.cache.misses,
+        )
+        return report
+
+
+# -----------------------------------------
+# Optional local HTTP endpoint
+# -----------------------------------------
+def make_http_server(service: MatchService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """
+    GET /match?q=steel+pipe&k=3  -> {"query": ..., "matches": [...]}
+    GET /stats                   -> latency and cache counters
+
+    A query that fails answers 500 with {"error": ...}.
+
+    Call serve_forever() on the result (port 0 picks a free port).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            if url.path == "/stats":
+                self._send(200, service.stats())
+                return
+            if url.path != "/match" or not params.get("q"):
+                self._send(404, {"error": "use /match?q=<text>[&k=<n>] or /stats"})
+                return
+
+            try:
+                k = int(params["k"][0]) if "k" in params else None
+            except ValueError:
+                self._send(400, {"error": "k must be an integer"})
+                return
+
+            try:
+                result = service.match(params["q"][0], k)
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+
+            self._send(200, {
+                "query": result.query,
+                "matches": [
+                    {
+                        "wikidata_id": m.wikidata_id,
+                        "confidence_score": m.confidence_score,
+                        "review_needed": m.review_needed,
+                    }
+                    for m in result.matches
+                ],
+            })
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
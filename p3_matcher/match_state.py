@@ -0,0 +1,203 @@
+import os
+import json
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from p3_core.types import WikidataMaterial, CddaItem
+from p3_matcher.match_result import MatchResult
+from p3_matcher.material_matcher import MaterialMatcher, embedding_matrix
+from p3_matcher.parallel_matching import parallel_matches
+
+
+STATE_VERSION = 1
+
+
+def embedding_fingerprint(vector: np.ndarray) -> str:
+    vector = np.ascontiguousarray(vector)
+    payload = f"{vector.dtype.str}{vector.shape}".encode("utf-8") + vector.tobytes()
+    return hashlib.sha1(payload).hexdigest()
+
+
+@dataclass
+class UpdateStats:
+    new_materials: int = 0
+    new_items: int = 0          # new or changed items
+    removed_items: int = 0
+    rescored_materials: int = 0 # scored against every item
+    pairs_scored: int = 0
+
+
+class MatchState:
+    """
+    Persisted top-k matches per material, plus an embedding fingerprint
+    per material and item, so update() only scores what changed:
+
+      - new / changed materials are scored against every item
+      - materials whose stored matches involve a changed or removed item
+        are rescored against every item
+      - all other materials are scored against the new / changed items
+        only, and those candidates are merged into their stored matches
+    """
+
+    def __init__(self, matcher: Optional[MaterialMatcher] = None, k: int = 1):
+        """
+        k: matches kept per material; k = 1 gives exactly MaterialMatcher.match
+        """
+        self.matcher = matcher or MaterialMatcher()
+        self.k = k
+
+        self.material_order: List[str] = []
+        self.material_fp: Dict[str, str] = {}
+        self.item_fp: Dict[str, str] = {}
+        self.matches: Dict[str, List[Tuple[str, float]]] = {}   # qid -> [(cdda_id, score)]
+
+    # ------------------------------------------------------------
+    # Update
+    # ------------------------------------------------------------
+    def _score(self, source: np.ndarray, target: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        idx, score = parallel_matches(
+            source, target, self.k, self.matcher.workers, self.matcher.block_size
+        )
+        if self.k == 1:
+            return idx[:, None], score[:, None]
+        return idx, score
+
+    def update(
+        self,
+        wikidata_materials: List[WikidataMaterial],
+        cdda_items: List[CddaItem],
+    ) -> UpdateStats:
+        """
+        Brings the stored matches in line with the current materials and
+        items (the full current lists; unchanged entries are not rescored).
+        """
+        source, materials = embedding_matrix(wikidata_materials)
+        target, items = embedding_matrix(cdda_items)
+        stats = UpdateStats()
+
+        material_fp = {m.qid: embedding_fingerprint(source[i]) for i, m in enumerate(materials)}
+        item_fp = {item.id: embedding_fingerprint(target[i]) for i, item in enumerate(items)}
+        item_pos = {item.id: pos for pos, item in enumerate(items)}
+
+        new_rows = [pos for pos, item in enumerate(items) if self.item_fp.get(item.id) != item_fp[item.id]]
+        stale = {cid for cid, fp in self.item_fp.items() if item_fp.get(cid) != fp}
+        stats.new_items = len(new_rows)
+        stats.removed_items = len(set(self.item_fp) - set(item_fp))
+
+        full: List[int] = []
+        partial: List[int] = []
+        for i, material in enumerate(materials):
+            if self.material_fp.get(material.qid) != material_fp[material.qid]:
+                stats.new_materials += 1
+                full.append(i)
+            elif any(cid in stale for cid, _ in self.matches.get(material.qid, [])):
+                full.append(i)
+            else:
+                partial.append(i)
+        stats.rescored_materials = len(full)
+
+        matches = {m.qid: self.matches.get(m.qid, []) for m in materials}
+
+        if full and items:
+            stats.pairs_scored += len(full) * len(items)
+            idx, score = self._score(source[full], target)
+            for i, row_idx, row_score in zip(full, idx, score):
+                matches[materials[i].qid] = [
+                    (items[j].id, float(s)) for j, s in zip(row_idx, row_score) if j >= 0 and s > 0
+                ]
+        elif full:
+            for i in full:
+                matches[materials[i].qid] = []
+
+        if partial and new_rows:
+            stats.pairs_scored += len(partial) * len(new_rows)
+            idx, score = self._score(source[partial], target[new_rows])
+            for i, row_idx, row_score in zip(partial, idx, score):
+                qid = materials[i].qid
+                found = [
+                    (items[new_rows[j]].id, float(s))
+                    for j, s in zip(row_idx, row_score) if j >= 0 and s > 0
+                ]
+                # same order a full run would give: score, then item position
+                merged = sorted(matches[qid] + found, key=lambda m: (-m[1], item_pos[m[0]]))
+                matches[qid] = merged[: self.k]
+
+        self.material_order = [m.qid for m in materials]
+        self.material_fp = material_fp
+        self.item_fp = item_fp
+        self.matches = matches
+        return stats
+
+    # ------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------
+    def _result(self, qid: str, cdda_id: str, score: float) -> MatchResult:
+        return MatchResult(
+            wikidata_id=qid,
+            cdda_id=cdda_id,
+            confidence_score=score,
+            review_needed=bool(score < self.matcher.threshold),
+        )
+
+    def results(self) -> List[MatchResult]:
+        """
+        Best match per material, in material order (as MaterialMatcher.match).
+        """
+        return [
+            self._result(qid, *self.matches[qid][0])
+            for qid in self.material_order
+            if self.matches.get(qid)
+        ]
+
+    def top_k(self) -> Dict[str, List[MatchResult]]:
+        return {
+            qid: [self._result(qid, cid, score) for cid, score in self.matches.get(qid, [])]
+            for qid in self.material_order
+        }
+
+    # ------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": STATE_VERSION,
+                "k": self.k,
+                "material_order": self.material_order,
+                "material_fp": self.material_fp,
+                "item_fp": self.item_fp,
+                "matches": self.matches,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, matcher: Optional[MaterialMatcher] = None, k: int = 1) -> "MatchState":
+        """
+        Reads a saved state; a missing, unreadable or incompatible file
+        gives an empty state (the next update() is then a full match).
+        """
+        state = cls(matcher, k)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return state
+        if stored.get("version") != STATE_VERSION or stored.get("k") != k:
+            return state
+
+        state.material_order = stored["material_order"]
+        state.material_fp = stored["material_fp"]
+        state.item_fp = stored["item_fp"]
+        state.matches = {
+            qid: [(cid, score) for cid, score in found]
+            for qid, found in stored["matches"].items()
+        }
+        return state
@@ -1,8 +1,29 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from p3_core.types import WikidataMaterial, CddaItem
 from p3_matcher.match_result import MatchResult
-from p3_embeddings.matcher_utils import cosine_similarity
+from p3_matcher.ann_index import IVFIndex
+from p3_matcher.blocking import BlockingIndex, BlockingStats, material_keys
+from p3_matcher.parallel_matching import parallel_matches
+from p3_embeddings.matcher_utils import best_matches
+
+
+def embedding_matrix(records: Sequence[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Stacks the embeddings of records that have one.
+    Columnar stores hand over their matrix without restacking.
+    Returns (matrix, the records its rows belong to).
+    """
+    if hasattr(records, "embedding_matrix"):
+        matrix, rows = records.embedding_matrix()
+        return matrix, [records[int(r)] for r in rows]
+
+    owners = [r for r in records if r.embedding is not None]
+    if not owners:
+        return np.zeros((0, 0)), []
+    return np.stack([np.asarray(r.embedding) for r in owners]), owners
 
 
 class MaterialMatcher:
@@ -11,44 +32,258 @@ class MaterialMatcher:
     using embedding similarity.
     """
 
-    def __init__(self, threshold: float = 0.85):
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        block_size: int = 1024,
+        index: Optional[IVFIndex] = None,
+        n_probe: Optional[int] = None,
+        workers: int = 1,
+    ):
+        """
+        threshold: matches scoring below it are flagged review_needed
+        block_size: rows per side scored in one matrix product; bounds the
+                    score block to block_size x block_size floats
+        index: optional ANN index over CDDA item embeddings (see build_index);
+               when set, match() searches it instead of scoring every item
+        n_probe: index cells scanned per material; higher is slower but
+                 closer to exact (defaults to the index's own setting)
+        workers: processes for exact scoring; > 1 shards the query side over
+                 a pool with both matrices in shared memory (same results)
+        """
         self.threshold = threshold
+        self.block_size = block_size
+        self.index = index
+        self.n_probe = n_probe
+        self.workers = workers
+
+    # ------------------------------------------------------------
+    # ANN backend
+    # ------------------------------------------------------------
+    def build_index(self, cdda_items: List[CddaItem], n_lists: Optional[int] = None) -> IVFIndex:
+        target, items = embedding_matrix(cdda_items)
+        self.index = IVFIndex.build([item.id for item in items], target, n_lists=n_lists)
+        return self.index
+
+    def add_items(self, cdda_items: List[CddaItem]) -> None:
+        """
+        Adds newly loaded items to the index without rebuilding it.
+        """
+        target, items = embedding_matrix(cdda_items)
+        if not items:
+            return
+        if self.index is None:
+            self.build_index(cdda_items)
+        else:
+            self.index.add([item.id for item in items], target)
 
+    # ------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------
     def match(
         self,
         wikidata_materials: List[WikidataMaterial],
-        cdda_items: List[CddaItem],
+        cdda_items: Optional[List[CddaItem]] = None,
     ) -> List[MatchResult]:
+        """
+        Best CDDA item per material (first item wins ties; materials whose
+        best score is not > 0 are left out), in material order.
 
-        results: List[MatchResult] = []
+        Without an index every item in cdda_items is scored. With one, items
+        not yet indexed are added first and only the index is searched, so
+        cdda_items may be omitted once everything has been added.
+        """
+        source, materials = embedding_matrix(wikidata_materials)
+        if not materials:
+            return []
 
-        for material in wikidata_materials:
-            if material.embedding is None:
+        if self.index is not None:
+            if cdda_items is not None:
+                indexed = set(self.index.ids)
+                self.add_items([item for item in cdda_items if item.id not in indexed])
+            if len(self.index) == 0:
+                return []
+            rows, scores = self.index.query(source, k=1, n_probe=self.n_probe)
+            best_idx, best_score = rows[:, 0], scores[:, 0]
+            best_idx[best_score <= 0] = -1
+            item_ids = self.index.ids
+        else:
+            target, items = embedding_matrix(cdda_items or [])
+            if not items:
+                return []
+            best_idx, best_score = self._scored(source, target)
+            item_ids = [item.id for item in items]
+
+        results: List[MatchResult] = []
+        for material, idx, score in zip(materials, best_idx, best_score):
+            if idx < 0:
                 continue
+            results.append(self._result(material.qid, item_ids[idx], score))
+
+        return results
 
-            best_score = 0.0
-            best_item = None
+    def match_top_k(
+        self,
+        wikidata_materials: List[WikidataMaterial],
+        cdda_items: Optional[List[CddaItem]] = None,
+        k: int = 5,
+    ) -> Dict[str, List[MatchResult]]:
+        """
+        Up to k ranked CDDA candidates per material (best first, ties in item
+        order, only scores > 0), keyed by QID in material order. The first
+        candidate is match()'s pick for that material, score included.
+        Uses the index the same way match() does when one is set.
+        """
+        source, materials = embedding_matrix(wikidata_materials)
+        if not materials:
+            return {}
 
-            for item in cdda_items:
-                if item.embedding is None:
-                    continue
+        if self.index is not None:
+            if cdda_items is not None:
+                indexed = set(self.index.ids)
+                self.add_items([item for item in cdda_items if item.id not in indexed])
+            if len(self.index) == 0:
+                return {}
+            top_idx, top_score = self.index.query(source, k=k, n_probe=self.n_probe)
+            item_ids = self.index.ids
+        else:
+            target, items = embedding_matrix(cdda_items or [])
+            if not items:
+                return {}
+            top_idx, top_score = self._scored(source, target, k)
+            if k == 1:
+                top_idx, top_score = top_idx[:, None], top_score[:, None]
+            item_ids = [item.id for item in items]
+
+        return {
+            material.qid: [
+                self._result(material.qid, item_ids[idx], score)
+                for idx, score in zip(row_idx, row_score)
+                if idx >= 0 and score > 0
+            ]
+            for material, row_idx, row_score in zip(materials, top_idx, top_score)
+        }
+
+    def match_blocked(
+        self,
+        wikidata_materials: List[WikidataMaterial],
+        cdda_items: List[CddaItem],
+        min_trigrams: int = 2,
+        measure_recall: bool = False,
+        full_fraction: float = 0.5,
+    ) -> Tuple[List[MatchResult], BlockingStats]:
+        """
+        match(), but each material is only scored against the items that
+        share a token or min_trigrams trigrams with its label / aliases
+        (see p3_matcher.blocking). Materials with the same candidate block
+        are scored together in one call. Materials with no lexical
+        candidates, or with more than full_fraction of all items as
+        candidates, are scored against every item in one batch instead.
 
-                score = cosine_similarity(material.embedding, item.embedding)
+        measure_recall: also run the exact match and record in the stats
+                        how many of its best items blocking kept
+        """
+        source, materials = embedding_matrix(wikidata_materials)
+        target, items = embedding_matrix(cdda_items)
+        stats = BlockingStats(materials=len(materials), items=len(items))
+        if not materials or not items:
+            return [], stats
 
-                if score > best_score:
-                    best_score = score
-                    best_item = item
+        blocking = BlockingIndex(items, min_trigrams)
+        best_idx = np.full(len(materials), -1, dtype=np.int64)
+        best_score = np.zeros(len(materials))
+        fallback: List[int] = []
+        groups: Dict[bytes, Tuple[np.ndarray, List[int]]] = {}
 
-            if best_item is None:
+        for i, material in enumerate(materials):
+            rows = blocking.candidates(material_keys(material))
+            if len(rows) == 0 or len(rows) > full_fraction * len(items):
+                fallback.append(i)
                 continue
+            groups.setdefault(rows.tobytes(), (rows, []))[1].append(i)
 
-            results.append(
-                MatchResult(
-                    wikidata_id=material.qid,
-                    cdda_id=best_item.id,
-                    confidence_score=best_score,
-                    review_needed=best_score < self.threshold,
-                )
-            )
+        for rows, members in groups.values():
+            stats.pairs_scored += len(members) * len(rows)
+            idx, score = best_matches(source[members], target[rows], self.block_size)
+            found = idx >= 0
+            best_idx[np.array(members)[found]] = rows[idx[found]]
+            best_score[np.array(members)[found]] = score[found]
 
-        return results
+        if fallback:
+            stats.fallbacks = len(fallback)
+            stats.pairs_scored += len(fallback) * len(items)
+            best_idx[fallback], best_score[fallback] = self._scored(source[fallback], target)
+
+        if measure_recall:
+            exact_idx, _ = self._scored(source, target)
+            found = exact_idx >= 0
+            stats.recall = float((best_idx[found] == exact_idx[found]).mean()) if found.any() else 1.0
+
+        results = [
+            self._result(material.qid, items[idx].id, score)
+            for material, idx, score in zip(materials, best_idx, best_score)
+            if idx >= 0
+        ]
+        return results, stats
+
+    def match_items(
+        self,
+        wikidata_materials: List[WikidataMaterial],
+        cdda_items: List[CddaItem],
+    ) -> List[MatchResult]:
+        """
+        Reverse direction: best material per CDDA item (first material wins
+        ties; items whose best score is not > 0 are left out), in item order.
+        Always exact; the index only covers the item side.
+        """
+        source, materials = embedding_matrix(wikidata_materials)
+        target, items = embedding_matrix(cdda_items)
+        if not materials or not items:
+            return []
+
+        best_idx, best_score = self._scored(target, source)
+
+        return [
+            self._result(materials[idx].qid, item.id, score)
+            for item, idx, score in zip(items, best_idx, best_score)
+            if idx >= 0
+        ]
+
+    def match_mutual(
+        self,
+        wikidata_materials: List[WikidataMaterial],
+        cdda_items: List[CddaItem],
+    ) -> List[MatchResult]:
+        """
+        match() results whose CDDA item also picks that material as its own
+        best match (mutual-best filter), in material order.
+        """
+        forward = self.match(wikidata_materials, cdda_items)
+        return mutual_best(forward, self.match_items(wikidata_materials, cdda_items))
+
+    def _scored(self, source: np.ndarray, target: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact best (k = 1) or top-k target rows per source row, serial or
+        over the process pool depending on self.workers.
+        """
+        return parallel_matches(source, target, k, self.workers, self.block_size)
+
+    def _result(self, qid: str, cdda_id: str, score: float) -> MatchResult:
+        return MatchResult(
+            wikidata_id=qid,
+            cdda_id=cdda_id,
+            confidence_score=float(score),
+            review_needed=bool(score < self.threshold),
+        )
+
+
+def mutual_best(
+    forward: List[MatchResult],
+    reverse: List[MatchResult],
+) -> List[MatchResult]:
+    """
+    Keeps the material -> item matches whose item -> material match
+    points back at the same material.
+    """
+    back = {r.cdda_id: r.wikidata_id for r in reverse}
+    return [r for r in forward if back.get(r.cdda_id) == r.wikidata_id]
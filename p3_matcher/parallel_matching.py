@@ -0,0 +1,130 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from p3_embeddings.matcher_utils import best_matches, top_k_matches
+
+
+# (shared memory block name, shape, dtype string)
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+# One pool per worker count, kept across calls so repeated matches do not
+# pay process start-up each time; shut down at interpreter exit.
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    pool = _POOLS.get(workers)
+    if pool is None:
+        pool = _POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+@atexit.register
+def _shutdown_pools() -> None:
+    while _POOLS:
+        _POOLS.popitem()[1].shutdown()
+
+
+def _share(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, ArraySpec]:
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _match_shard(
+    source_spec: ArraySpec,
+    target_spec: ArraySpec,
+    start: int,
+    stop: int,
+    k: int,
+    block_size: int,
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Pool worker: scores source rows start..stop against the whole target,
+    reading both matrices straight from shared memory.
+    """
+    blocks = [shared_memory.SharedMemory(name=spec[0]) for spec in (source_spec, target_spec)]
+    try:
+        source, target = (
+            np.ndarray(spec[1], dtype=spec[2], buffer=block.buf)
+            for spec, block in zip((source_spec, target_spec), blocks)
+        )
+        if k == 1:
+            idx, score = best_matches(source[start:stop], target, block_size)
+        else:
+            idx, score = top_k_matches(source[start:stop], target, k, block_size)
+        # results are copies, so the views can be released before returning
+        del source, target
+        return start, idx, score
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def parallel_matches(
+    source: np.ndarray,
+    target: np.ndarray,
+    k: int = 1,
+    workers: Optional[int] = None,
+    block_size: int = 1024,
+    shard_size: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    best_matches (k = 1) or top_k_matches (k > 1) with the source rows
+    sharded over a process pool.
+
+    Both matrices are copied into shared memory once; workers map them
+    instead of receiving pickled copies. Every source row is scored
+    against the full target by the same serial function, and shards are
+    put back in row order, so the output is the serial output.
+
+    Shards are sized from the row count and workers alone (about four
+    per worker) unless shard_size is given; the pool is reused across calls.
+    """
+    n = source.shape[0]
+    workers = workers or 1
+    shard_size = shard_size or -(-n // (workers * 4))
+
+    if workers <= 1 or n <= shard_size or target.shape[0] == 0:
+        if k == 1:
+            return best_matches(source, target, block_size)
+        return top_k_matches(source, target, k, block_size)
+
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        source_block, source_spec = _share(source)
+        blocks.append(source_block)
+        target_block, target_spec = _share(target)
+        blocks.append(target_block)
+
+        pool = _pool(workers)
+        shards = {}
+        try:
+            futures = [
+                pool.submit(_match_shard, source_spec, target_spec,
+                            start, min(n, start + shard_size), k, block_size)
+                for start in range(0, n, shard_size)
+            ]
+            for future in futures:
+                start, idx, score = future.result()
+                shards[start] = (idx, score)
+        except BrokenProcessPool:
+            # a dead worker poisons the pool; start a fresh one next call
+            _POOLS.pop(workers, None)
+            raise
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    starts = sorted(shards)
+    return (
+        np.concatenate([shards[s][0] for s in starts]),
+        np.concatenate([shards[s][1] for s in starts]),
+    )
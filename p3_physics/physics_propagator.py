@@ -1,9 +1,15 @@
-from typing import Dict
+from typing import Dict, Iterable, List, Tuple
 from collections import defaultdict
 
+import numpy as np
+
+from p3_core.columnar_store import ItemStore, WikidataMaterialView
 from p3_core.types import CddaItem, WikidataMaterial
 
 
+PROPAGATED_FIELDS = ("density", "melting_point", "thermal_conductivity")
+
+
 class PhysicsPropagator:
     """
     Propagates real-world physics from base materials
@@ -15,6 +21,34 @@ class PhysicsPropagator:
         wikidata_index: material_name -> WikidataMaterial
         """
         self.wikidata_index = wikidata_index
+        self._columns = None
+
+    def _material_columns(self) -> Tuple[Dict[str, int], Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+        """
+        name -> column position, and (values, mask) per propagated field.
+        Views of a MaterialStore are gathered straight from its columns.
+        """
+        if self._columns is None:
+            names = list(self.wikidata_index)
+            mats = [self.wikidata_index[n] for n in names]
+            stores = {id(m._store) for m in mats if isinstance(m, WikidataMaterialView)}
+
+            columns = {}
+            if mats and len(stores) == 1 and all(isinstance(m, WikidataMaterialView) for m in mats):
+                store = mats[0]._store
+                rows = np.array([m._row for m in mats], dtype=np.int64)
+                for field in PROPAGATED_FIELDS:
+                    values, mask = store.column(field)
+                    columns[field] = (np.nan_to_num(values[rows]), mask[rows])
+            else:
+                for field in PROPAGATED_FIELDS:
+                    raw = [getattr(m, field) for m in mats]
+                    mask = np.array([v is not None for v in raw], dtype=bool)
+                    values = np.array([0.0 if v is None else v for v in raw], dtype=float)
+                    columns[field] = (values, mask)
+
+            self._columns = ({n: i for i, n in enumerate(names)}, columns)
+        return self._columns
 
     def propagate(
         self,
@@ -63,3 +97,67 @@ class PhysicsPropagator:
 
         item.physics = physics
         return physics
+
+    def propagate_all(
+        self,
+        items: Iterable[CddaItem],
+        breakdowns: Dict[str, Dict[str, float]],
+    ) -> List[Dict[str, float]]:
+        """
+        propagate() for many items at once (breakdowns: item_id ->
+        { material_name -> quantity }, e.g. RecipeDecomposer.decompose_all).
+        Weighted sums are taken over the material columns with one
+        bincount per field instead of per-object attribute access.
+        With an ItemStore the physics column is written directly.
+
+        Returns the physics dict per item, in item order.
+        """
+        position, columns = self._material_columns()
+        items = list(items) if not isinstance(items, ItemStore) else items
+        n = len(items)
+
+        item_rows: List[int] = []
+        mat_cols: List[int] = []
+        qtys: List[float] = []
+        for row, item in enumerate(items):
+            for mat_name, qty in (breakdowns.get(item.id) or {}).items():
+                col = position.get(mat_name)
+                if col is None:
+                    continue
+                item_rows.append(row)
+                mat_cols.append(col)
+                qtys.append(float(qty))
+
+        rows = np.array(item_rows, dtype=np.int64)
+        cols = np.array(mat_cols, dtype=np.int64)
+        weights = np.array(qtys, dtype=float)
+
+        total_weight = np.bincount(rows, weights=weights, minlength=n)
+        sums = {}
+        for field, (values, mask) in columns.items():
+            present = mask[cols]
+            sums[field] = (
+                np.bincount(rows, weights=np.where(present, values[cols] * weights, 0.0), minlength=n),
+                np.bincount(rows, weights=present.astype(float), minlength=n) > 0,
+            )
+
+        results: List[Dict[str, float]] = []
+        for row in range(n):
+            if total_weight[row] == 0:
+                results.append({})
+                continue
+            physics = {
+                field: float(totals[row] / total_weight[row])
+                for field, (totals, seen) in sums.items()
+                if seen[row]
+            }
+            results.append(physics)
+
+        # like propagate(), items without any known material are left as is
+        for row in np.flatnonzero(total_weight != 0):
+            if isinstance(items, ItemStore):
+                items.objects["physics"][row] = results[row]
+            else:
+                items[row].physics = results[row]
+
+        return results
@@ -1,5 +1,7 @@
 from typing import Optional
 
+import numpy as np
+
 
 # -----------------------------
 # Helper normalization functions
@@ -97,3 +99,42 @@ def price_composite_material(
         constituent_price_sum=base * depth_mult,
         processing_complexity=recipe_depth,
     )
+
+
+# -----------------------------
+# Column-wise pricing (MaterialStore)
+# -----------------------------
+
+def base_material_prices(
+    density: np.ndarray,
+    melting_point: np.ndarray,
+    tensile_strength: np.ndarray,
+    rarity_factor: np.ndarray,
+) -> np.ndarray:
+    """
+    base_material_price over whole columns; NaN counts as a missing value.
+    """
+
+    price = (
+        np.nan_to_num(density) * 0.4 +
+        np.nan_to_num(melting_point) * 0.002 +
+        np.nan_to_num(tensile_strength) * 0.3
+    )
+
+    price = price * rarity_factor
+    return np.round(np.clip(price, 0.1, 10_000.0), 2)
+
+
+def price_raw_materials(store) -> np.ndarray:
+    """
+    Accepts a MaterialStore; returns one price per row.
+    """
+
+    rarity = np.array([1.2 if aliases else 1.0 for aliases in store.objects["aliases"]])
+
+    return base_material_prices(
+        density=store.columns["density"],
+        melting_point=store.columns["melting_point"],
+        tensile_strength=store.columns["tensile_strength"],
+        rarity_factor=rarity,
+    )
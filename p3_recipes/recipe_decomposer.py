@@ -1,4 +1,4 @@
-from typing import Dict, Set
+from typing import Dict, Iterable, Optional, Set
 from collections import defaultdict
 
 from p3_core.types import CddaItem
@@ -61,3 +61,19 @@ class RecipeDecomposer:
 
         self._cache[item.id] = dict(materials)
         return dict(materials)
+
+    def decompose_all(
+        self,
+        items: Optional[Iterable[CddaItem]] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Decomposes every item (default: the whole index) in one pass.
+        Shared sub-components are decomposed once thanks to the cache.
+
+        Returns item_id -> { base_material -> quantity }
+        """
+
+        if items is None:
+            items = self.item_index.values()
+
+        return {item.id: self.decompose(item) for item in items}
@@ -0,0 +1,95 @@
+from typing import Any, Dict, Iterable, List
+
+from p3_core.types import CddaItem
+
+
+def normalize_components(
+    components: List[Any],
+    result_mult: float = 1.0,
+    alternatives: str = "first",
+) -> Dict[str, float]:
+    """
+    Flattens CDDA recipe components into {component_id: qty per result}.
+
+    components: [[["steel_lump", 2], ["steel_chunk", 8]], [["rag", 1]]]
+                (AND over groups, OR over the alternatives in a group)
+                Requirement references (["cordage_short", 1, "LIST"]) are
+                not items, so they are skipped; a group made only of them
+                contributes nothing.
+    alternatives: "first"    -> take the first alternative of each group,
+                                which is the one CDDA lists as preferred
+                  "weighted" -> split each group evenly over its alternatives
+    """
+    normalized: Dict[str, float] = {}
+
+    for group in components or []:
+        options = [
+            alt for alt in group
+            if isinstance(alt, list) and len(alt) >= 2 and isinstance(alt[0], str)
+            and not (len(alt) >= 3 and alt[2] == "LIST")
+        ]
+        if not options:
+            continue
+
+        if alternatives == "weighted":
+            share = 1.0 / len(options)
+        else:
+            options, share = options[:1], 1.0
+
+        for alt in options:
+            try:
+                qty = float(alt[1]) * share / result_mult
+            except (TypeError, ValueError):
+                continue
+            normalized[alt[0]] = normalized.get(alt[0], 0.0) + qty
+
+    return normalized
+
+
+def build_recipe_index(
+    entries: Iterable[Dict[str, Any]],
+    alternatives: str = "first",
+) -> Dict[str, List[Dict[str, float]]]:
+    """
+    One pass over raw CDDA entries: result id -> normalized recipes,
+    in load order. Obsolete recipes and uncraft entries are skipped.
+    """
+    index: Dict[str, List[Dict[str, float]]] = {}
+
+    for entry in entries:
+        if entry.get("type") != "recipe" or entry.get("obsolete"):
+            continue
+
+        result = entry.get("result")
+        if not isinstance(result, str):
+            continue
+
+        try:
+            result_mult = float(entry.get("result_mult", 1) or 1)
+        except (TypeError, ValueError):
+            result_mult = 1.0
+
+        recipe = normalize_components(entry.get("components", []), result_mult, alternatives)
+        if recipe:
+            index.setdefault(result, []).append(recipe)
+
+    return index
+
+
+def attach_recipes(
+    items: Iterable[CddaItem],
+    index: Dict[str, List[Dict[str, float]]],
+) -> int:
+    """
+    Sets item.recipes to the primary (first loaded) recipe for every item
+    that has one. Returns how many items got a recipe.
+    """
+    attached = 0
+
+    for item in items:
+        recipes = index.get(item.id)
+        if recipes:
+            item.recipes = [recipes[0]]
+            attached += 1
+
+    return attached
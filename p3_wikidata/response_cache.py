@@ -0,0 +1,76 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheMiss(LookupError):
+    """
+    Raised in offline mode when a query has no cached response.
+    """
+
+
+class SparqlResponseCache:
+    """
+    On-disk cache of SPARQL JSON responses, one gzip file per query:
+
+        <cache_dir>/<key[:2]>/<key>.json.gz
+        {"fetched_at": unix time, "endpoint": ..., "query": ..., "response": {...}}
+
+    The key is a SHA-256 of endpoint + query text, so a whole cache
+    directory can be copied to another host and replayed offline.
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = 7 * 24 * 3600):
+        """
+        ttl: seconds a response stays fresh (None = never expires)
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(endpoint: str, query: str) -> str:
+        return hashlib.sha256(f"{endpoint}\0{query}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json.gz")
+
+    def read(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        (fetched_at, response) regardless of age, or None if absent/unreadable.
+        """
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                stored = json.load(f)
+            return float(stored["fetched_at"]), stored["response"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def is_fresh(self, fetched_at: float) -> bool:
+        return self.ttl is None or time.time() - fetched_at <= self.ttl
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        stored = self.read(key)
+        if stored is None or not (allow_stale or self.is_fresh(stored[0])):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return stored[1]
+
+    def put(self, key: str, endpoint: str, query: str, response: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "fetched_at": time.time(),
+                "endpoint": endpoint,
+                "query": query,
+                "response": response,
+            }, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,128 @@
+import re
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from p3_core.types import WikidataMaterial
+from p3_wikidata.units import QUANTITY_FIELDS
+
+
+_WHITESPACE = " \t\r\n,"
+_TRAILING_SLICE = re.compile(r"\s*(LIMIT|OFFSET)\s+\d+\s*$", re.IGNORECASE)
+
+# Fields a query row can fill; embeddings, units and flags are not row data
+MERGED_FIELDS = ("label", "description") + QUANTITY_FIELDS + ("aliases",)
+
+
+# ------------------------------------------------------------
+# Streaming parse of SPARQL JSON results
+# ------------------------------------------------------------
+def iter_bindings(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the objects of results.bindings from a SPARQL JSON response
+    delivered in text chunks, decoding one binding at a time with
+    JSONDecoder.raw_decode; the full response is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf, pos = "", 0
+
+    def more() -> bool:
+        nonlocal buf, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    # skip ahead to the start of the bindings array
+    while True:
+        key = buf.find('"bindings"', pos)
+        start = buf.find("[", key) if key >= 0 else -1
+        if start >= 0:
+            pos = start + 1
+            break
+        if not more():
+            raise ValueError("SPARQL response has no results.bindings array")
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            if not more():
+                raise ValueError("SPARQL response ended inside results.bindings")
+            continue
+        if buf[pos] == "]":
+            return
+
+        try:
+            binding, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # binding split across chunks
+            if not more():
+                raise
+            continue
+        yield binding
+        pos = end
+
+
+# ------------------------------------------------------------
+# Pagination
+# ------------------------------------------------------------
+def paginate(query: str, page_size: int, offset: int) -> str:
+    """
+    Rewrites a query to fetch one page: drops its own LIMIT / OFFSET,
+    orders rows by ?material (so pages are stable and a material's rows
+    stay adjacent) and appends LIMIT page_size OFFSET offset.
+    """
+    body = query.rstrip()
+    while _TRAILING_SLICE.search(body):
+        body = _TRAILING_SLICE.sub("", body)
+    if not re.search(r"ORDER\s+BY", body, re.IGNORECASE):
+        body += "\nORDER BY ?material"
+    return f"{body}\nLIMIT {page_size} OFFSET {offset}\n"
+
+
+# ------------------------------------------------------------
+# Per-QID row merging
+# ------------------------------------------------------------
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list)) and len(value) == 0)
+
+
+def merge_material(into: WikidataMaterial, other: WikidataMaterial) -> WikidataMaterial:
+    """
+    Fills every empty data field of `into` from `other` (first non-null
+    wins); a copied quantity brings its unit along, and aliases are
+    copied, not shared. Wikidata returns one row per combination of
+    multi-valued properties.
+    """
+    for name in MERGED_FIELDS:
+        value = getattr(other, name)
+        if not _is_empty(getattr(into, name)) or _is_empty(value):
+            continue
+        setattr(into, name, list(value) if name == "aliases" else value)
+        if name in other.units:
+            into.units[name] = other.units[name]
+
+    for flag in other.flags:
+        if flag not in into.flags:
+            into.flags.append(flag)
+    return into
+
+
+def merge_adjacent(materials: Iterable[WikidataMaterial]) -> Iterator[WikidataMaterial]:
+    """
+    Merges runs of rows for the same QID as they stream past; with rows
+    ordered by QID this yields each material once, holding one at a time.
+    Non-adjacent repeats are yielded separately (callers dedupe by QID).
+    """
+    current: Optional[WikidataMaterial] = None
+    for material in materials:
+        if current is not None and material.qid == current.qid:
+            merge_material(current, material)
+            continue
+        if current is not None:
+            yield current
+        current = material
+    if current is not None:
+        yield current
@@ -0,0 +1,179 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from p3_core.types import WikidataMaterial
+
+
+QUANTITY_FIELDS = ("density", "melting_point", "tensile_strength", "thermal_conductivity")
+
+# -----------------------------------------
+# Wikidata unit QIDs -> target units
+# -----------------------------------------
+# value_in_target = value * scale + offset
+#   density               -> g/cm³
+#   melting_point         -> °C
+#   tensile_strength      -> MPa
+#   thermal_conductivity  -> W/(m·K)
+TARGET_UNITS: Dict[str, str] = {
+    "density": "Q13147228",               # gram per cubic centimetre
+    "melting_point": "Q25267",            # degree Celsius
+    "tensile_strength": "Q21062777",      # megapascal
+    "thermal_conductivity": "Q752197",    # watt per metre kelvin
+}
+
+# Wikidata's unit "1": a quantity entered without a unit. Read as already
+# being in the target unit, the same as a row without unit information.
+UNITLESS = "Q199"
+
+UNIT_CONVERSIONS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "density": {
+        "Q13147228": (1.0, 0.0),          # g/cm³
+        "Q844211": (0.001, 0.0),          # kg/m³
+        "Q834105": (0.001, 0.0),          # g/L
+    },
+    "melting_point": {
+        "Q25267": (1.0, 0.0),             # °C
+        "Q11579": (1.0, -273.15),         # K
+        "Q42289": (5.0 / 9.0, -32.0 * 5.0 / 9.0),   # °F
+    },
+    "tensile_strength": {
+        "Q21062777": (1.0, 0.0),          # MPa
+        "Q44395": (1e-6, 0.0),            # Pa
+        "Q21064807": (1e-3, 0.0),         # kPa
+        "Q21064845": (1e3, 0.0),          # GPa
+    },
+    "thermal_conductivity": {
+        "Q752197": (1.0, 0.0),            # W/(m·K)
+    },
+}
+
+# Physically plausible bounds in target units; values outside are flagged
+PLAUSIBLE_RANGES: Dict[str, Tuple[float, float]] = {
+    "density": (1e-5, 25.0),              # hydrogen gas .. osmium
+    "melting_point": (-273.15, 4500.0),   # absolute zero .. carbon
+    "tensile_strength": (0.0, 150_000.0), # .. graphene
+    "thermal_conductivity": (0.0, 6000.0),
+}
+
+
+def unit_qid(iri: Optional[str]) -> Optional[str]:
+    """
+    "http://www.wikidata.org/entity/Q11579" -> "Q11579"; None stays None.
+    """
+    if not iri:
+        return None
+    return iri.rsplit("/", 1)[-1]
+
+
+def normalize_column(
+    field_name: str,
+    values: np.ndarray,
+    units: Sequence[Optional[str]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converts one quantity column to its target unit in a single pass.
+
+    values: float array, NaN where missing
+    units: unit QID per row; None (rows fetched without unit information)
+           and UNITLESS mean the value is already in the target unit
+
+    Returns (converted values, unknown-unit mask, out-of-range mask).
+    Rows with a unit missing from UNIT_CONVERSIONS become NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    table = UNIT_CONVERSIONS[field_name]
+    target = TARGET_UNITS[field_name]
+
+    keys = [target if u is None or u == UNITLESS else u for u in units]
+    distinct, inverse = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    known = np.array([u in table for u in distinct], dtype=bool)
+    scale = np.array([table.get(u, (np.nan, 0.0))[0] for u in distinct])
+    offset = np.array([table.get(u, (np.nan, 0.0))[1] for u in distinct])
+
+    present = ~np.isnan(values)
+    converted = values * scale[inverse] + offset[inverse]
+    unknown = present & ~known[inverse]
+
+    low, high = PLAUSIBLE_RANGES[field_name]
+    with np.errstate(invalid="ignore"):
+        out_of_range = present & ~unknown & ((converted < low) | (converted > high))
+
+    return converted, unknown, out_of_range
+
+
+def normalize_materials(materials: List[WikidataMaterial]) -> int:
+    """
+    Converts every quantity field of the materials to its target unit,
+    one vectorized pass per field, and records the target unit in
+    material.units. Values in an unknown unit are dropped and flagged
+    "<field>:unknown_unit:<QID>"; implausible values are kept and flagged
+    "<field>:out_of_range". Already-normalized materials are unchanged.
+    Returns the number of values flagged.
+    """
+    if not materials:
+        return 0
+
+    flagged = 0
+    for name in QUANTITY_FIELDS:
+        raw = [getattr(m, name) for m in materials]
+        values = np.array([np.nan if v is None else v for v in raw], dtype=float)
+        units = [m.units.get(name) for m in materials]
+
+        converted, unknown, out_of_range = normalize_column(name, values, units)
+        flagged += int(unknown.sum() + out_of_range.sum())
+
+        for row in np.flatnonzero(~np.isnan(values)):
+            m = materials[row]
+            if unknown[row]:
+                _flag(m, f"{name}:unknown_unit:{units[row]}")
+                setattr(m, name, None)
+                m.units.pop(name, None)
+                continue
+            setattr(m, name, float(converted[row]))
+            m.units[name] = TARGET_UNITS[name]
+            if out_of_range[row]:
+                _flag(m, f"{name}:out_of_range")
+
+    return flagged
+
+
+def _flag(material: WikidataMaterial, flag: str) -> None:
+    if flag not in material.flags:
+        material.flags.append(flag)
+
+
+def normalize_store(store) -> int:
+    """
+    normalize_materials for a MaterialStore, converting its numeric
+    columns in place (masks cleared where the unit is unknown).
+    """
+    units_col = store.objects["units"]
+    flags_col = store.objects["flags"]
+    flagged = 0
+
+    for name in QUANTITY_FIELDS:
+        values, mask = store.column(name)
+        units = [(u or {}).get(name) for u in units_col]
+
+        converted, unknown, out_of_range = normalize_column(name, values, units)
+        flagged += int(unknown.sum() + out_of_range.sum())
+
+        keep = mask & ~unknown
+        values[keep] = converted[keep]
+        values[unknown] = np.nan
+        mask[unknown] = False
+
+        for row in np.flatnonzero(mask | unknown):
+            row_units = units_col[row] = units_col[row] or {}
+            row_flags = flags_col[row] = flags_col[row] or []
+            if unknown[row]:
+                flag = f"{name}:unknown_unit:{units[row]}"
+                row_units.pop(name, None)
+            else:
+                row_units[name] = TARGET_UNITS[name]
+                flag = f"{name}:out_of_range" if out_of_range[row] else None
+            if flag and flag not in row_flags:
+                row_flags.append(flag)
+
+    return flagged
@@ -1,8 +1,16 @@
 import os
+import threading
 import requests
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from p3_embeddings.dedup import DedupStats, embed_unique
 from p3_embeddings.embedder import MiniLMEmbedder
 from p3_core.types import WikidataMaterial
+from p3_wikidata.response_cache import CacheMiss, SparqlResponseCache
+from p3_wikidata.sparql_stream import iter_bindings, merge_adjacent, merge_material, paginate
+from p3_wikidata.units import QUANTITY_FIELDS, normalize_materials, unit_qid
 
 
 WIKIDATA_SPARQL_ENDPOINT = "https://query.wikidata.org/sparql"
@@ -12,6 +20,19 @@ DEFAULT_HEADERS = {
     "User-Agent": "ProjectP3-MaterialEngine/1.0 (contact: developer@example.com)"
 }
 
+# Material list queries run by fetch_all_materials, in merge order
+MATERIAL_QUERIES = (
+    "chemical_elements.sparql",
+    "common_materials.sparql",
+    "alloys.sparql",
+)
+
+# Template for alias + physics enrichment; {{qids}} takes a VALUES batch
+ENRICHMENT_QUERY = "physical_properties.sparql"
+
+# Rate limiting and transient server errors are retried with backoff
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
 
 class WikidataMaterialsClient:
     """
@@ -19,11 +40,58 @@ class WikidataMaterialsClient:
     Handles SPARQL execution + result parsing.
     """
 
-    def __init__(self, queries_dir: str = None):
+    def __init__(
+        self,
+        queries_dir: str = None,
+        endpoint: str = WIKIDATA_SPARQL_ENDPOINT,
+        query_files: Sequence[str] = MATERIAL_QUERIES,
+        max_workers: int = 4,
+        retries: int = 5,
+        backoff_factor: float = 1.0,
+        timeout: float = 30,
+        cache: Optional[SparqlResponseCache] = None,
+        force_refresh: bool = False,
+        offline: bool = False,
+        page_size: Optional[int] = None,
+        normalize_chunk: int = 1000,
+    ):
+        """
+        endpoint: SPARQL endpoint (e.g. a local mirror)
+        query_files: .sparql files in queries_dir that fetch_all_materials runs
+        max_workers: queries in flight at once; also the connection pool size
+        retries / backoff_factor: retry budget for 429 / 5xx and connection
+                                  errors, sleeping backoff_factor * 2^n
+                                  seconds (or Retry-After) between attempts
+        cache: on-disk response cache; fresh entries skip the network, and
+               a stale entry is used if the endpoint cannot be reached
+        force_refresh: always query the endpoint (and refresh the cache)
+        offline: never touch the network; answer only from the cache
+                 (any age) and raise CacheMiss for anything not in it
+        page_size: fetch each query in ORDER BY ?material pages of this many
+                   rows (replacing its own LIMIT) until a short page;
+                   None runs each query once as written
+        normalize_chunk: materials per vectorized unit-normalization pass
+        """
+        if offline and cache is None:
+            raise ValueError("offline mode needs a response cache")
+
         # Path to SPARQL query files
         self.queries_dir = queries_dir or os.path.join(
             os.path.dirname(__file__), "queries"
         )
+        self.endpoint = endpoint
+        self.query_files = list(query_files)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.cache = cache
+        self.force_refresh = force_refresh
+        self.offline = offline
+        self.page_size = page_size
+        self.normalize_chunk = normalize_chunk
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
 
     # ------------------------------------------------------------
     # Load SPARQL file contents
@@ -33,19 +101,116 @@ class WikidataMaterialsClient:
         with open(path, "r", encoding="utf-8") as f:
             return f.read()
 
+    # ------------------------------------------------------------
+    # Pooled HTTP session
+    # ------------------------------------------------------------
+    @property
+    def session(self) -> requests.Session:
+        """
+        One keep-alive session for all queries, with a connection pool
+        sized for max_workers and retry/backoff on 429 and 5xx. Created on
+        first use under a lock, so concurrent fetches share one session.
+        """
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._new_session()
+            return self._session
+
+    def _new_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
     # ------------------------------------------------------------
     # Execute SPARQL query
     # ------------------------------------------------------------
     def _run_query(self, query: str) -> Dict[str, Any]:
-        resp = requests.get(
-            WIKIDATA_SPARQL_ENDPOINT,
+        if self.cache is None:
+            return self._fetch(query)
+
+        key = self.cache.key(self.endpoint, query)
+        if self.offline:
+            cached = self.cache.get(key, allow_stale=True)
+            if cached is None:
+                raise CacheMiss(f"no cached response for query {key[:12]} (offline)")
+            return cached
+        if not self.force_refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            data = self._fetch(query)
+        except requests.exceptions.RequestException:
+            stale = None if self.force_refresh else self.cache.get(key, allow_stale=True)
+            if stale is None:
+                raise
+            return stale
+
+        self.cache.put(key, self.endpoint, query, data)
+        return data
+
+    def _fetch(self, query: str) -> Dict[str, Any]:
+        resp = self.session.get(
+            self.endpoint,
             params={"query": query},
-            headers=DEFAULT_HEADERS,
-            timeout=30
+            timeout=self.timeout,
         )
         resp.raise_for_status()
         return resp.json()
 
+    def _stream_rows(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Bindings of one query, parsed incrementally off the socket.
+        """
+        with self.session.get(
+            self.endpoint,
+            params={"query": query},
+            timeout=self.timeout,
+            stream=True,
+        ) as resp:
+            resp.raise_for_status()
+            resp.encoding = resp.encoding or "utf-8"
+            yield from iter_bindings(resp.iter_content(chunk_size=65536, decode_unicode=True))
+
+    def _iter_rows(self, query: str) -> Iterator[Dict[str, Any]]:
+        # cached responses are stored whole, so they go through _run_query
+        if self.cache is not None:
+            yield from self._run_query(query)["results"]["bindings"]
+        else:
+            yield from self._stream_rows(query)
+
+    def _iter_pages(self, query: str) -> Iterator[Dict[str, Any]]:
+        offset = 0
+        while True:
+            count = 0
+            for row in self._iter_rows(paginate(query, self.page_size, offset)):
+                count += 1
+                yield row
+            if count < self.page_size:
+                return
+            offset += self.page_size
+
     # ------------------------------------------------------------
     # Helpers to convert Wikidata bindings to Python numbers
     # ------------------------------------------------------------
@@ -57,6 +222,18 @@ class WikidataMaterialsClient:
         except Exception:
             return None
 
+    def _parse_quantity(self, row: Dict[str, Any], name: str) -> Tuple[Optional[float], Optional[str]]:
+        """
+        (amount, unit QID) for a quantity column. The unit comes from
+        <name>_unit, or from an "amount|unit IRI" value (enrichment rows).
+        """
+        value = row.get(name)
+        unit = row.get(f"{name}_unit", {}).get("value")
+        if value and "|" in value.get("value", ""):
+            amount, unit = value["value"].split("|", 1)
+            value = {"value": amount}
+        return self._parse_float(value), unit_qid(unit)
+
     # ------------------------------------------------------------
     # Convert row into WikidataMaterial dataclass
     # ------------------------------------------------------------
@@ -65,72 +242,167 @@ class WikidataMaterialsClient:
         label = row.get("materialLabel", {}).get("value", "")
         description = row.get("materialDescription", {}).get("value", "")
 
-        density = self._parse_float(row.get("density"))
-        melting_point = self._parse_float(row.get("melting_point"))
-        tensile_strength = self._parse_float(row.get("tensile_strength"))
-        thermal_conductivity = self._parse_float(row.get("thermal_conductivity"))
+        quantities: Dict[str, Optional[float]] = {}
+        units: Dict[str, str] = {}
+        for name in QUANTITY_FIELDS:
+            quantities[name], unit = self._parse_quantity(row, name)
+            if quantities[name] is not None and unit:
+                units[name] = unit
+
+        # enrichment rows carry aliases GROUP_CONCAT'ed with "|"
+        aliases_text = row.get("aliases", {}).get("value", "")
+        aliases = [a for a in aliases_text.split("|") if a]
 
         return WikidataMaterial(
             qid=qid,
             label=label,
             description=description,
-            density=density,
-            melting_point=melting_point,
-            tensile_strength=tensile_strength,
-            thermal_conductivity=thermal_conductivity,
-            aliases=[],
+            density=quantities["density"],
+            melting_point=quantities["melting_point"],
+            tensile_strength=quantities["tensile_strength"],
+            thermal_conductivity=quantities["thermal_conductivity"],
+            aliases=aliases,
             embedding=None,
+            units=units,
         )
 
+    # ------------------------------------------------------------
+    # Public: Run one material list query
+    # ------------------------------------------------------------
+    def iter_query(self, filename: str) -> Iterator[WikidataMaterial]:
+        """
+        Streams the materials of one query file. Rows for the same QID that
+        arrive together (one per value of a multi-valued property) are
+        merged, first non-null value per field. With page_size set, memory
+        stays flat however many materials the query matches.
+
+        Quantities are converted to target units (see p3_wikidata.units)
+        in vectorized chunks of normalize_chunk materials.
+        """
+        query = self._load_query(filename)
+        rows = self._iter_pages(query) if self.page_size else self._iter_rows(query)
+
+        chunk: List[WikidataMaterial] = []
+        for material in merge_adjacent(self._binding_to_material(row) for row in rows):
+            chunk.append(material)
+            if len(chunk) >= self.normalize_chunk:
+                normalize_materials(chunk)
+                yield from chunk
+                chunk = []
+        normalize_materials(chunk)
+        yield from chunk
+
+    def fetch_query(self, filename: str) -> List[WikidataMaterial]:
+        unique: Dict[str, WikidataMaterial] = {}
+        for m in self.iter_query(filename):
+            if m.qid in unique:
+                merge_material(unique[m.qid], m)
+            else:
+                unique[m.qid] = m
+        return list(unique.values())
+
     # ------------------------------------------------------------
     # Public: Fetch chemical elements
     # ------------------------------------------------------------
     def fetch_elements(self) -> List[WikidataMaterial]:
-        query = self._load_query("chemical_elements.sparql")
-        data = self._run_query(query)
-        results = data["results"]["bindings"]
-        return [self._binding_to_material(row) for row in results]
+        return self.fetch_query("chemical_elements.sparql")
 
     # ------------------------------------------------------------
     # Public: Fetch common industrial materials
     # ------------------------------------------------------------
     def fetch_common_materials(self) -> List[WikidataMaterial]:
-        query = self._load_query("common_materials.sparql")
-        data = self._run_query(query)
-        results = data["results"]["bindings"]
-        return [self._binding_to_material(row) for row in results]
+        return self.fetch_query("common_materials.sparql")
 
     # ------------------------------------------------------------
     # Public: Fetch alloys (steel, bronze, brass, etc.)
     # ------------------------------------------------------------
     def fetch_alloys(self) -> List[WikidataMaterial]:
-        query = self._load_query("alloys.sparql")
-        data = self._run_query(query)
-        results = data["results"]["bindings"]
-        return [self._binding_to_material(row) for row in results]
+        return self.fetch_query("alloys.sparql")
 
     # ------------------------------------------------------------
     # Public: Combine all sources into one master list
     # ------------------------------------------------------------
-    def fetch_all_materials(self) -> List[WikidataMaterial]:
-        materials = []
-        materials.extend(self.fetch_elements())
-        materials.extend(self.fetch_common_materials())
-        materials.extend(self.fetch_alloys())
+    def fetch_all_materials(self, concurrent: bool = True) -> List[WikidataMaterial]:
+        """
+        Runs every file in query_files, up to max_workers at a time over
+        the pooled session (concurrent=False runs them one by one).
+        Results are merged in query_files order, so the output does not
+        depend on which query finishes first.
+        """
+        if concurrent and len(self.query_files) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                batches = list(pool.map(self.fetch_query, self.query_files))
+        else:
+            batches = [self.fetch_query(f) for f in self.query_files]
 
         # Remove duplicates (same QID)
         unique = {}
-        for m in materials:
-            unique[m.qid] = m
+        for batch in batches:
+            for m in batch:
+                unique[m.qid] = m
 
         return list(unique.values())
+
+    # ------------------------------------------------------------
+    # Public: Batched alias + physics enrichment
+    # ------------------------------------------------------------
+    def enrich_materials(
+        self,
+        materials: List[WikidataMaterial],
+        batch_size: int = 200,
+        concurrent: bool = True,
+    ) -> int:
+        """
+        Fills aliases and missing physics properties in place from
+        physical_properties.sparql, sending the QIDs in VALUES batches of
+        batch_size (up to max_workers batches at once) instead of one
+        lookup per material. Values already set are kept.
+        Returns how many materials gained at least one field.
+        """
+        template = self._load_query(ENRICHMENT_QUERY)
+        by_qid: Dict[str, List[WikidataMaterial]] = {}
+        for m in materials:
+            by_qid.setdefault(m.qid, []).append(m)
+
+        qids = list(by_qid)
+        queries = [
+            template.replace("{{qids}}", " ".join(f"wd:{q}" for q in qids[i:i + batch_size]))
+            for i in range(0, len(qids), batch_size)
+        ]
+
+        def run(query: str) -> List[WikidataMaterial]:
+            rows = self._run_query(query)["results"]["bindings"]
+            return [self._binding_to_material(row) for row in rows]
+
+        if concurrent and len(queries) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                batches = list(pool.map(run, queries))
+        else:
+            batches = [run(q) for q in queries]
+
+        enriched = set()
+        for batch in batches:
+            normalize_materials(batch)
+            for found in batch:
+                for m in by_qid.get(found.qid, []):
+                    before = (m.aliases, m.density, m.melting_point,
+                              m.tensile_strength, m.thermal_conductivity)
+                    merge_material(m, found)
+                    after = (m.aliases, m.density, m.melting_point,
+                             m.tensile_strength, m.thermal_conductivity)
+                    if after != before:
+                        enriched.add(found.qid)
+
+        return len(enriched)
+
     def embed_materials(
         self,
         materials: List[WikidataMaterial],
         embedder: MiniLMEmbedder,
-    ) -> None:
+    ) -> DedupStats:
         """
         Generate embeddings for WikidataMaterial objects in-place.
+        Identical texts are encoded once.
         """
 
         texts = []
@@ -145,8 +417,10 @@ class WikidataMaterialsClient:
 
             texts.append(" ".join(parts))
 
-        embeddings = embedder.embed(texts)
+        embeddings, stats = embed_unique(embedder, texts)
 
         for mat, emb in zip(materials, embeddings):
             mat.embedding = emb
 
+        return stats
+
@@ -1,7 +1,10 @@
 from p3_wikidata.wikidata_materials_client import WikidataMaterialsClient
+from p3_wikidata.response_cache import SparqlResponseCache
 from p3_cdda.cdda_loader import CddaLoader
 
+from p3_embeddings.batching import EncodeStats
 from p3_embeddings.embedder import MiniLMEmbedder
+from p3_embeddings.embedding_cache import EmbeddingCache
 from p3_matcher.material_matcher import MaterialMatcher
 from p3_physics.physics_inheritance import PhysicsInheritanceEngine
 from p3_pricing.pricing_formula_builder import (
@@ -18,9 +21,11 @@ def run_pipeline():
     # Step 1: Load real-world physics (Wikidata)
     # ----------------------------------------------------
     print("\n[1] Fetching materials from Wikidata...")
-    wiki_client = WikidataMaterialsClient()
+    wiki_client = WikidataMaterialsClient(cache=SparqlResponseCache("cache/sparql"))
     wikidata_materials = wiki_client.fetch_all_materials()
     print(f"  → Loaded {len(wikidata_materials)} Wikidata materials")
+    enriched = wiki_client.enrich_materials(wikidata_materials)
+    print(f"  → Enriched {enriched} materials with aliases / properties")
 
     # ----------------------------------------------------
     # Step 2: Load CDDA game items
@@ -29,15 +34,26 @@ def run_pipeline():
     cdda_loader = CddaLoader("CDDA_JSON")
     cdda_items = cdda_loader.load_all_items()
     print(f"  → Loaded {len(cdda_items)} CDDA items")
+    for path, error in cdda_loader.failed_files:
+        print(f"  ! Skipped {path}: {error}")
 
     # ----------------------------------------------------
     # Step 3: Embeddings + Matching (Day 2)
     # ----------------------------------------------------
     print("\n[3] Computing embeddings & running matcher...")
-    embedder = MiniLMEmbedder()
-
-    wiki_client.embed_materials(wikidata_materials, embedder)
-    cdda_loader.embed_items(cdda_items, embedder)
+    embedder = MiniLMEmbedder(cache=EmbeddingCache("cache/embeddings"))
+
+    for label, embed in (
+        ("Wikidata", lambda: wiki_client.embed_materials(wikidata_materials, embedder)),
+        ("CDDA", lambda: cdda_loader.embed_items(cdda_items, embedder)),
+    ):
+        embedder.stats = EncodeStats()
+        stats = embed()
+        print(
+            f"  → {label}: {stats.unique}/{stats.total} unique texts "
+            f"({stats.dedup_ratio:.0%} deduplicated), "
+            f"{embedder.stats.texts} encoded at {embedder.stats.texts_per_sec:.0f} texts/sec"
+        )
 
     matcher = MaterialMatcher(threshold=0.85)
     match_results = matcher.match(wikidata_materials, cdda_items)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from p3_core.types import CddaItem, WikidataMaterial
+from p3_matcher.ann_index import IVFIndex, recall_report
+from p3_matcher.material_matcher import MaterialMatcher
+
+
+def _clustered(n, dim=32, centers=8, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.normal(size=(centers, dim))
+    return means[rng.integers(centers, size=n)] + 0.1 * rng.normal(size=(n, dim))
+
+
+def test_full_probe_is_exact():
+    vectors = _clustered(300)
+    queries = _clustered(20, seed=1)
+    index = IVFIndex.build([f"i{n}" for n in range(300)], vectors, n_lists=10)
+
+    rows, scores = index.query(queries, k=5, n_probe=10)
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(q @ normed.T), axis=1, kind="stable")[:, :5]
+    assert (rows == exact).all()
+    assert np.allclose(scores, np.take_along_axis(q @ normed.T, exact, axis=1), atol=1e-5)
+
+    report = recall_report(index, queries, k=5, n_probes=(1, 10))
+    assert report[10]["recall"] == 1.0 and report[10]["scanned"] == 1.0
+    assert report[1]["scanned"] < 1.0
+
+
+def test_add_and_save_load_round_trip(tmp_path):
+    vectors = _clustered(100)
+    index = IVFIndex.build([f"i{n}" for n in range(80)], vectors[:80], n_lists=4)
+    index.add([f"i{n}" for n in range(80, 100)], vectors[80:])
+    assert len(index) == 100
+
+    path = str(tmp_path / "items.npz")
+    index.save(path)
+    loaded = IVFIndex.load(path)
+
+    assert loaded.ids == index.ids
+    assert loaded.query_ids(vectors[95], k=1, n_probe=4)[0][0][0] == "i95"
+    assert (loaded.query(vectors, k=3)[0] == index.query(vectors, k=3)[0]).all()
+
+    index.save(str(tmp_path / "items_no_suffix"))
+    assert IVFIndex.load(str(tmp_path / "items_no_suffix")).ids == index.ids
+    assert IVFIndex.load(str(tmp_path / "items_no_suffix.npz")).ids == index.ids
+
+
+def test_matcher_index_backend_matches_exact_with_full_probe():
+    rng = np.random.default_rng(3)
+    items = [
+        CddaItem(f"item_{n}", f"item {n}", None, None, None, [], [], vec, None, None)
+        for n, vec in enumerate(_clustered(200, seed=4))
+    ]
+    materials = [
+        WikidataMaterial(f"Q{n}", f"m{n}", "", None, None, None, None, [], vec)
+        for n, vec in enumerate(rng.normal(size=(15, 32)))
+    ]
+
+    exact = MaterialMatcher().match(materials, items)
+
+    matcher = MaterialMatcher(n_probe=14)
+    matcher.build_index(items[:150], n_lists=14)
+    approx = matcher.match(materials, items)   # indexes the 50 new items
+
+    assert len(matcher.index) == 200
+    assert [(r.wikidata_id, r.cdda_id) for r in approx] == [(r.wikidata_id, r.cdda_id) for r in exact]
+    assert np.allclose(
+        [r.confidence_score for r in approx], [r.confidence_score for r in exact], atol=1e-5
+    )
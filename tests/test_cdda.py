@@ -1,7 +1,275 @@
-from p3_cdda.cdda_loader import CddaLoader
+import os
+import json
+import time
+import zipfile
+
+from p3_cdda.cdda_loader import FIELDS_SCHEMA, CddaLoader, plan_batches
+from p3_cdda import lenient_json
+from p3_cdda.inheritance import resolve_inheritance
+from p3_cdda.parse_cache import ParseCache
 
 loader = CddaLoader("path/to/CDDA/data/json")
 items = loader.load_all_items()
 
 print("Loaded:", len(items))
 print(items[:5])
+
+
+def _write_cdda_tree(root):
+    (root / "items").mkdir()
+    (root / "items" / "metal.json").write_text(
+        """[
+          // CDDA style comment
+          { "type": "GENERIC", "id": "steel_lump", "name": { "str": "steel lump" },
+            "weight": "250 g", "material": [ "steel" ], },
+          { "type": "GENERIC", "id": "scrap", "name": "scrap metal", "material": "steel" }
+        ]""",
+        encoding="utf-8",
+    )
+    (root / "items" / "wood.json").write_text(
+        '[{ "type": "GENERIC", "id": "stick", "name": "stick", "material": ["wood"] }]',
+        encoding="utf-8",
+    )
+    (root / "broken.json").write_text("[{ not json", encoding="utf-8")
+
+
+def test_parallel_load_matches_serial(tmp_path):
+    _write_cdda_tree(tmp_path)
+
+    serial = CddaLoader(str(tmp_path)).load_all_items()
+    parallel_loader = CddaLoader(str(tmp_path), workers=2)
+    parallel = parallel_loader.load_all_items()
+
+    assert [i.id for i in serial] == ["steel_lump", "scrap", "stick"]
+    assert parallel == serial
+    assert serial[0].name == "steel lump"
+
+    failed_paths = [path for path, _ in parallel_loader.failed_files]
+    assert failed_paths == [str(tmp_path / "broken.json")]
+
+
+def test_parse_cache_reparses_only_changed_files(tmp_path):
+    data_dir = tmp_path / "json"
+    data_dir.mkdir()
+    _write_cdda_tree(data_dir)
+    cache_path = str(tmp_path / "parse_cache.pkl")
+
+    first = CddaLoader(str(data_dir), cache_path=cache_path).load_all_items()
+
+    cache = ParseCache(cache_path, FIELDS_SCHEMA)
+    assert len(cache.entries) == 2  # the broken file is never cached
+
+    (data_dir / "items" / "wood.json").write_text(
+        '[{ "type": "GENERIC", "id": "plank", "name": "plank", "material": ["wood"] }]',
+        encoding="utf-8",
+    )
+    (data_dir / "items" / "metal.json").touch()
+    second = CddaLoader(str(data_dir), cache_path=cache_path).load_all_items()
+
+    assert [i.id for i in first] == ["steel_lump", "scrap", "stick"]
+    assert [i.id for i in second] == ["steel_lump", "scrap", "plank"]
+
+    os.remove(data_dir / "items" / "wood.json")
+    CddaLoader(str(data_dir), cache_path=cache_path).load_all_items()
+    assert len(ParseCache(cache_path, FIELDS_SCHEMA).entries) == 1
+
+
+def test_iter_items_streams_and_filters_by_type(tmp_path):
+    _write_cdda_tree(tmp_path)
+    (tmp_path / "tools.json").write_text(
+        '[{ "type": "TOOL", "id": "hammer", "name": "hammer", "material": ["steel", "wood"] }]',
+        encoding="utf-8",
+    )
+    loader = CddaLoader(str(tmp_path), workers=2)
+
+    stream = loader.iter_items(types={"TOOL"})
+    assert not isinstance(stream, list)
+    assert [i.id for i in stream] == ["hammer"]
+
+    assert [i.id for i in loader.iter_items()] == ["steel_lump", "scrap", "stick", "hammer"]
+    assert len(loader.failed_files) == 1
+
+
+def test_lenient_json_strips_comments_and_trailing_commas():
+    text = """
+    // header comment
+    [
+      { "id": "url", "name": "http://example.com // not a comment", /* block */ },
+      { "id": "quote", "text": "a \\"quoted, \\" value,]", "tags": [ "x", "y", ], },
+    ]
+    """
+    assert lenient_json.loads(text) == [
+        {"id": "url", "name": "http://example.com // not a comment"},
+        {"id": "quote", "text": 'a "quoted, " value,]', "tags": ["x", "y"]},
+    ]
+
+
+def test_load_all_items_resolves_copy_from(tmp_path):
+    (tmp_path / "templates.json").write_text(
+        """[
+          { "type": "GENERIC", "abstract": "sword_base", "weight": "1000 g",
+            "price": 100, "material": [ "steel" ] },
+          { "type": "GENERIC", "id": "sword", "copy-from": "sword_base", "name": "sword",
+            "relative": { "weight": "200 g" }, "extend": { "material": [ "leather" ] } },
+          { "type": "GENERIC", "id": "fancy_sword", "copy-from": "sword",
+            "name": "fancy sword", "proportional": { "price": 2 },
+            "delete": { "material": [ "steel" ] } },
+          { "type": "GENERIC", "id": "loop_a", "copy-from": "loop_b" },
+          { "type": "GENERIC", "id": "loop_b", "copy-from": "loop_a" }
+        ]""",
+        encoding="utf-8",
+    )
+    loader = CddaLoader(str(tmp_path))
+    items = {i.id: i for i in loader.load_all_items()}
+
+    assert items["sword"].weight == "1200 g"
+    assert items["sword"].price == 100
+    assert items["sword"].materials == ["steel", "leather"]
+    assert items["fancy_sword"].weight == "1200 g"
+    assert items["fancy_sword"].price == 200
+    assert items["fancy_sword"].materials == ["leather"]
+    assert sorted(map(sorted, loader.inheritance_cycles)) == [["loop_a", "loop_b"]]
+
+
+def test_relative_converts_units_within_a_dimension():
+    entries = [
+        {"type": "GENERIC", "abstract": "base", "weight": "1 kg", "volume": "2 L", "price": 100},
+        {"type": "GENERIC", "id": "heavier", "copy-from": "base",
+         "relative": {"weight": "200 g", "volume": "250 ml", "price": "1 kg"}},
+        {"type": "GENERIC", "abstract": "bare", "weight": 1000},
+        {"type": "GENERIC", "id": "bare_plus", "copy-from": "bare", "relative": {"weight": "0.5 kg"}},
+    ]
+    resolved, _ = resolve_inheritance(entries)
+    heavier, bare_plus = resolved[1], resolved[3]
+
+    assert heavier["weight"] == "1.2 kg" and heavier["volume"] == "2.25 L"
+    assert heavier["price"] == 100   # no common dimension: left unchanged
+    assert bare_plus["weight"] == 1500
+
+
+def test_copy_from_own_id_extends_previous_definition():
+    entries = [
+        {"id": "rock", "weight": "500 g", "material": ["stone"]},
+        {"id": "rock", "copy-from": "rock", "extend": {"material": ["iron"]}},
+    ]
+    resolved, cycles = resolve_inheritance(entries)
+
+    assert cycles == []
+    assert resolved[1] == {"id": "rock", "weight": "500 g", "material": ["stone", "iron"]}
+
+
+def test_zip_source_matches_directory_load(tmp_path):
+    data_dir = tmp_path / "json"
+    data_dir.mkdir()
+    _write_cdda_tree(data_dir)
+
+    archive_path = tmp_path / "cdda.zip"
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path in sorted(data_dir.rglob("*.json")):
+            rel = path.relative_to(data_dir).as_posix()
+            archive.write(path, f"Cataclysm-DDA-master/data/json/{rel}")
+        archive.writestr("Cataclysm-DDA-master/.vscode/settings.json", '{"id": "not_an_item"}')
+
+    cache_path = str(tmp_path / "parse_cache.pkl")
+    from_dir = CddaLoader(str(data_dir)).load_all_items()
+    zip_loader = CddaLoader(str(archive_path), workers=2, cache_path=cache_path)
+    from_zip = zip_loader.load_all_items()
+
+    assert from_zip == from_dir
+    assert [os.path.basename(path) for path, _ in zip_loader.failed_files] == ["broken.json"]
+
+    cache = ParseCache(cache_path, FIELDS_SCHEMA)
+    for member in zip_loader.source.list_members():
+        if not member.name.endswith("broken.json"):
+            assert cache.lookup_known(member.name, member.fingerprint) is not None
+
+
+def test_parallel_zip_load_reads_every_member(tmp_path):
+    archive_path = tmp_path / "cdda.zip"
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for f in range(400):
+            entries = [
+                {"type": "GENERIC", "id": f"item_{f}_{i}", "name": f"item {f} {i}",
+                 "weight": f"{i} g", "material": ["steel"]}
+                for i in range(40)
+            ]
+            archive.writestr(f"CDDA/data/json/items_{f:03d}.json", json.dumps(entries))
+
+    serial = CddaLoader(str(archive_path)).load_all_items()
+    loader = CddaLoader(str(archive_path), workers=8)
+    # the parent already holds a handle when the pool forks
+    loader.source.list_members()
+    parallel = loader.load_all_items()
+
+    assert loader.failed_files == []
+    assert len(serial) == 16000 and parallel == serial
+
+
+def test_zip_same_size_edit_newer_than_manifest_is_reparsed(tmp_path):
+    def write_zip(weight):
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr(
+                "CDDA/data/json/items.json",
+                '[{"type": "GENERIC", "id": "rock", "name": "rock", "weight": "%s"}]' % weight,
+            )
+
+    archive_path = tmp_path / "cdda.zip"
+    write_zip("250 g")
+    size = zipfile.ZipFile(archive_path).getinfo("CDDA/data/json/items.json").file_size
+    manifest = tmp_path / "json_index.json"
+    manifest.write_text(json.dumps(
+        [{"path": "data/json/items.json", "sha": "abc", "size": size, "type": "file"}]
+    ))
+
+    cache_path = str(tmp_path / "parse_cache.pkl")
+    load = lambda: CddaLoader(str(archive_path), cache_path=cache_path,
+                              manifest_path=str(manifest)).load_all_items()
+    assert load()[0].weight == "250 g"
+
+    time.sleep(0.01)
+    write_zip("260 g")   # same size, manifest not updated
+    assert load()[0].weight == "260 g"
+
+
+def test_plan_batches_is_contiguous_and_balanced():
+    batches = plan_batches([50, 10, 10, 10, 10, 10, 50], 3)
+
+    assert [pos for batch in batches for pos in batch] == list(range(7))
+    assert batches == [[0], [1, 2, 3, 4, 5], [6]]
+
+
+def test_load_all_items_attaches_recipes(tmp_path):
+    (tmp_path / "items.json").write_text(
+        '[{ "type": "GENERIC", "id": "steel_lump", "material": ["steel"] },'
+        ' { "type": "GENERIC", "id": "knife", "name": "knife" }]',
+        encoding="utf-8",
+    )
+    (tmp_path / "recipes.json").write_text(
+        '[{ "type": "recipe", "result": "knife", "components": [ [ [ "steel_lump", 1 ] ] ] }]',
+        encoding="utf-8",
+    )
+    loader = CddaLoader(str(tmp_path))
+    items = {i.id: i for i in loader.load_all_items()}
+
+    assert set(items) == {"steel_lump", "knife"}
+    assert items["knife"].recipes == [{"steel_lump": 1.0}]
+    assert loader.recipe_index == {"knife": [{"steel_lump": 1.0}]}
+
+
+def test_parse_cache_from_other_field_set_is_ignored(tmp_path):
+    (tmp_path / "recipes.json").write_text(
+        '[{ "type": "recipe", "result": "knife", "components": [ [ [ "steel_lump", 1 ] ] ] }]',
+        encoding="utf-8",
+    )
+    cache_path = str(tmp_path / "parse_cache.pkl")
+
+    # warmed before recipe fields were kept
+    old = ParseCache(cache_path, "old-schema")
+    _, fingerprint = old.lookup(str(tmp_path / "recipes.json"))
+    old.store(str(tmp_path / "recipes.json"), fingerprint, [{"type": "recipe"}])
+    old.save()
+
+    loader = CddaLoader(str(tmp_path), cache_path=cache_path)
+    loader.load_all_items()
+
+    assert loader.recipe_index == {"knife": [{"steel_lump": 1.0}]}
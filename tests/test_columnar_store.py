@@ -0,0 +1,48 @@
+import numpy as np
+
+from p3_core.types import WikidataMaterial, CddaItem
+from p3_core.columnar_store import ItemStore, MaterialStore
+from p3_pricing.pricing_formula_builder import price_raw_material, price_raw_materials
+
+
+def test_item_store_views_read_and_write_columns():
+    items = [
+        CddaItem(id="steel_lump", name="steel lump", weight="1 kg", volume="250 ml",
+                 price=100, materials=["steel"], embedding=np.ones(4)),
+        CddaItem(id="rag", name="rag", weight=None, materials=["cotton"]),
+    ]
+    store = ItemStore.from_items(items)
+
+    lump = store["steel_lump"]
+    assert lump.name == "steel lump"
+    assert lump.weight == 1000.0
+    assert lump.volume == 250.0
+    assert lump.materials == ["steel"]
+    assert store[1].weight is None and store[1].embedding is None
+
+    store[1].embedding = np.full(4, 2.0)
+    store[1].physics = {"density": 1.5}
+    matrix, rows = store.embedding_matrix()
+    assert matrix.shape == (2, 4) and list(rows) == [0, 1]
+
+    values, mask = store.column("weight")
+    assert mask.tolist() == [True, False] and np.isnan(values[1])
+
+    rag = store.to_items()[1]
+    assert rag.physics == {"density": 1.5}
+    assert rag.embedding.tolist() == [2.0] * 4
+
+
+def test_column_pricing_matches_per_object_pricing():
+    materials = [
+        WikidataMaterial(qid="Q11427", label="steel", density=7.85, melting_point=1370.0,
+                         tensile_strength=400.0, aliases=["carbon steel"]),
+        WikidataMaterial(qid="Q287", label="wood", density=0.6),
+        WikidataMaterial(qid="Q1", label="unknown"),
+    ]
+    store = MaterialStore.from_materials(materials)
+
+    prices = price_raw_materials(store)
+
+    assert prices.tolist() == [price_raw_material(m) for m in materials]
+    assert price_raw_material(store["Q287"]) == prices[1]
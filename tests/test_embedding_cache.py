@@ -0,0 +1,47 @@
+import numpy as np
+
+from p3_embeddings.embedding_cache import EmbeddingCache
+
+
+def _key(text):
+    return EmbeddingCache.key("test-model", True, text)
+
+
+def test_cache_round_trips_through_disk(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    cache.put_many([_key("iron"), _key("steel"), _key("wood")], vectors)
+    cache.save()
+
+    reopened = EmbeddingCache(str(tmp_path))
+    found, cached = reopened.get_many([_key("steel"), _key("glass"), _key("iron")])
+
+    assert found == [0, 2]
+    assert cached.tolist() == [vectors[1].tolist(), vectors[0].tolist()]
+    assert _key("iron") != EmbeddingCache.key("test-model", False, "iron")
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many([_key("a"), _key("b")], np.eye(2))
+    cache.get_many([_key("a")])
+    cache.put_many([_key("c")], np.array([[0.5, 0.5]]))
+
+    assert len(cache) == 2
+    assert cache.get_many([_key("a"), _key("b"), _key("c")])[0] == [0, 2]
+
+
+def test_eviction_is_on_disk_before_rows_are_reused(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many([_key("a"), _key("b")], np.eye(2))
+    cache.save()
+    cache.put_many([_key("c")], np.array([[0.5, 0.5]]))   # no save: a crash here
+
+    reopened = EmbeddingCache(str(tmp_path))
+    found, cached = reopened.get_many([_key("a"), _key("b"), _key("c")])
+
+    assert found == [1]
+    assert cached.tolist() == [[0.0, 1.0]]
+
+    reopened.put_many([_key("d")], np.array([[0.25, 0.75]]))
+    assert reopened.get_many([_key("b"), _key("d")])[1].tolist() == [[0.0, 1.0], [0.25, 0.75]]
@@ -0,0 +1,145 @@
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from p3_core.types import CddaItem
+from p3_core.columnar_store import ItemStore
+from p3_cdda.cdda_loader import CddaLoader
+from p3_embeddings.backends import EmbeddingBackend, HashingBackend
+from p3_embeddings.batching import plan_length_batches
+from p3_embeddings.dedup import embed_unique
+from p3_embeddings.embedder import MiniLMEmbedder
+from p3_embeddings.embedding_cache import EmbeddingCache
+from p3_embeddings.matcher_utils import cosine_similarity
+from p3_embeddings.quantization import quantize, recall_at_k
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.seen = []
+
+    def embed(self, texts):
+        self.seen.extend(texts)
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+def test_embed_unique_encodes_each_text_once():
+    embedder = CountingEmbedder()
+    vectors, stats = embed_unique(embedder, ["iron", "steel", "iron", "iron"])
+
+    assert embedder.seen == ["iron", "steel"]
+    assert [v.tolist() for v in vectors] == [[4, 1], [5, 1], [4, 1], [4, 1]]
+    assert (stats.total, stats.unique, stats.dedup_ratio) == (4, 2, 0.5)
+
+
+def test_embed_items_shares_vectors_between_identical_items():
+    items = [
+        CddaItem(id="rock", name="rock", materials=["stone"]),
+        CddaItem(id="rock_mod", name="rock", materials=["stone"]),
+        CddaItem(id="stick", name="stick", materials=["wood"]),
+    ]
+    embedder = CountingEmbedder()
+    stats = CddaLoader("unused").embed_items(items, embedder)
+
+    assert embedder.seen == ["rock stone", "stick wood"]
+    assert stats.unique == 2
+    assert items[1].embedding is not None
+    assert items[0].embedding.tolist() == items[1].embedding.tolist()
+
+
+def test_quantized_storage_keeps_recall_and_cosine():
+    rng = np.random.default_rng(0)
+    targets = rng.normal(size=(500, 384)).astype(np.float32)
+    targets /= np.linalg.norm(targets, axis=1, keepdims=True)
+    queries = targets[:50] + 0.05 * rng.normal(size=(50, 384)).astype(np.float32)
+
+    assert recall_at_k(queries, targets, "float16", k=1) == 1.0
+    assert recall_at_k(queries, targets, "int8", k=10) >= 0.95
+
+    codes = quantize(targets[:2], "int8")
+    assert codes.dtype == np.int8
+    assert abs(cosine_similarity(codes[0], codes[1]) - cosine_similarity(targets[0], targets[1])) < 0.01
+    assert abs(cosine_similarity(codes[0], codes[0]) - 1.0) < 1e-6
+
+
+def test_item_store_quantizes_embeddings():
+    items = [CddaItem(id="a", name="a", embedding=np.array([0.6, -0.8]))]
+    store = ItemStore.from_items(items, precision="int8")
+
+    assert store.embeddings.dtype == np.int8
+    assert store["a"].embedding.tolist() == [95, -127]
+
+
+class CountingBackend(HashingBackend):
+    def __init__(self):
+        super().__init__(dim=32)
+        self.encoded = []
+
+    def encode(self, texts, batch_size, normalize):
+        self.encoded.extend(texts)
+        return super().encode(texts, batch_size, normalize)
+
+
+def test_cached_embedder_skips_the_backend(tmp_path):
+    first = MiniLMEmbedder(backend=CountingBackend(), cache=EmbeddingCache(str(tmp_path)))
+    vectors = first.embed(["iron ingot", "wooden plank"])
+
+    backend = CountingBackend()
+    second = MiniLMEmbedder(backend=backend, cache=EmbeddingCache(str(tmp_path)))
+    again = second.embed(["wooden plank", "iron ingot", "glass shard"])
+
+    assert backend.encoded == ["glass shard"]
+    assert np.allclose(again[:2], vectors[::-1])
+    assert first.embedding_dim() == 32
+
+
+def test_hashing_backend_is_deterministic_and_normalized():
+    backend = HashingBackend()
+    a = backend.encode(["Steel sword"], batch_size=8, normalize=True)
+    b = HashingBackend().encode(["steel  SWORD"], batch_size=8, normalize=True)
+
+    assert a.shape == (1, 384)
+    assert np.allclose(a, b)
+    assert abs(np.linalg.norm(a) - 1.0) < 1e-6
+
+
+def test_backend_interface_is_abstract_and_model_names_the_backend():
+    with pytest.raises(TypeError):
+        EmbeddingBackend()
+
+    embedder = MiniLMEmbedder(backend=HashingBackend(dim=16))
+    with pytest.raises(AttributeError, match="HashingBackend"):
+        embedder.model
+
+
+def test_importing_embedder_does_not_load_torch():
+    code = (
+        "import sys, p3_embeddings.embedder, p3_cdda.cdda_loader; "
+        "sys.exit('sentence_transformers' in sys.modules or 'torch' in sys.modules)"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
+
+
+def test_length_batches_group_similar_lengths_within_budget():
+    texts = ["ax", "a much longer wikidata description " * 6, "rag", "iron", "x" * 300]
+    plan = plan_length_batches(texts, token_budget=40, max_batch_size=3)
+
+    assert sorted(i for batch in plan for i in batch) == list(range(5))
+    assert plan[0] == [0, 2, 3]
+    assert all(len(b) * max(min(len(texts[i]) // 4 + 2, 256) for i in b) <= 40 or len(b) == 1
+               for b in plan)
+
+
+def test_scheduled_embed_restores_input_order():
+    texts = ["steel", "a very long description of an alloy " * 10, "", "iron ore"]
+    plain = MiniLMEmbedder(backend=HashingBackend(), token_budget=0).embed(texts)
+    embedder = MiniLMEmbedder(backend=HashingBackend(), token_budget=64, max_batch_size=2)
+    scheduled = embedder.embed(texts)
+
+    assert np.allclose(plain, scheduled)
+    assert embedder.stats.texts == 4 and embedder.stats.batches >= 2
+    assert embedder.stats.texts_per_sec > 0
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from p3_core.types import WikidataMaterial
+from p3_embeddings.backends import HashingBackend
+from p3_embeddings.embedder import MiniLMEmbedder
+from p3_embeddings.embedding_cache import EmbeddingCache
+from p3_matcher.match_service import MatchService, QueryCache, make_http_server
+
+
+class CountingEmbedder(MiniLMEmbedder):
+    def __init__(self):
+        super().__init__(backend=HashingBackend())
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        if "explode" in texts:
+            raise RuntimeError("backend down")
+        return super().embed(texts)
+
+
+def _service(**kwargs):
+    embedder = CountingEmbedder()
+    labels = ["steel", "copper", "oak wood", "glass", "cotton"]
+    materials = [WikidataMaterial(qid=f"Q{i}", label=label) for i, label in enumerate(labels)]
+    for material, vector in zip(materials, embedder.embed(labels)):
+        material.embedding = vector
+    embedder.calls.clear()
+    return MatchService(embedder, materials, **kwargs), embedder
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put(("a", 1), [])
+    cache.put(("b", 1), [])
+    cache.get(("a", 1))
+    cache.put(("c", 1), [])
+    assert cache.get(("b", 1)) is None
+    assert cache.get(("a", 1)) == [] and cache.hits == 2
+
+
+def test_batch_queries_are_ranked_and_cached():
+    service, embedder = _service(k=3, threshold=0.9)
+
+    first = service.match_many(["steel", "oak wood plank", "steel"])
+    assert [r.query for r in first] == ["steel", "oak wood plank", "steel"]
+    assert first[0].matches[0].wikidata_id == "Q0" and first[0].matches[0].review_needed is False
+    assert first[1].matches[0].wikidata_id == "Q2"
+    assert len(first[0].matches) <= 3
+    assert embedder.calls == [["oak wood plank", "steel"]]
+
+    again = service.match_many(["steel"])
+    assert again == [first[0]] and len(embedder.calls) == 1
+    assert service.stats()["cache_hits"] >= 1 and service.stats()["count"] == 4
+
+
+def test_single_queries_are_micro_batched():
+    service, embedder = _service(max_wait_ms=50.0)
+    with service:
+        futures = [service.submit(text) for text in ["copper", "glass", "cotton", "copper"]]
+        results = [f.result(timeout=5) for f in futures]
+
+    assert [r.matches[0].wikidata_id for r in results] == ["Q1", "Q3", "Q4", "Q1"]
+    assert len(embedder.calls) < 4
+    stats = service.stats()
+    assert stats["count"] == 4 and stats["p99_ms"] >= stats["p50_ms"] > 0
+
+
+def test_concurrent_callers_share_a_cached_embedder(tmp_path):
+    labels = ["steel", "copper", "oak wood", "glass", "cotton"]
+    embedder = MiniLMEmbedder(backend=HashingBackend(), cache=EmbeddingCache(str(tmp_path)))
+    materials = [WikidataMaterial(qid=f"Q{i}", label=label) for i, label in enumerate(labels)]
+    for material, vector in zip(materials, embedder.embed(labels)):
+        material.embedding = vector
+    service = MatchService(embedder, materials, cache_size=0, max_wait_ms=1.0)
+
+    def run(worker):
+        texts = [f"{labels[(worker + n) % 5]} {worker} {n}" for n in range(20)]
+        if worker % 2:
+            return [service.match(text).matches[0].wikidata_id for text in texts]
+        return [r.matches[0].wikidata_id for r in service.match_many(texts)]
+
+    with service, ThreadPoolExecutor(max_workers=6) as pool:
+        found = list(pool.map(run, range(6)))
+
+    assert [len(ids) for ids in found] == [20] * 6
+    assert found[0][0] == "Q0" and found[1][0] == "Q1"
+
+
+def test_http_endpoint():
+    service, _ = _service()
+    server = make_http_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        body = requests.get(base + "/match", params={"q": "glass", "k": 2}, timeout=5).json()
+        assert body["query"] == "glass" and body["matches"][0]["wikidata_id"] == "Q3"
+        assert len(body["matches"]) <= 2
+        assert requests.get(base + "/stats", timeout=5).json()["count"] == 1
+        assert requests.get(base + "/nope", timeout=5).status_code == 404
+
+        failed = requests.get(base + "/match", params={"q": "explode"}, timeout=5)
+        assert failed.status_code == 500 and "backend down" in failed.json()["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
@@ -0,0 +1,67 @@
+import numpy as np
+
+from p3_core.types import CddaItem, WikidataMaterial
+from p3_matcher.match_state import MatchState
+from p3_matcher.material_matcher import MaterialMatcher
+
+
+def _world(seed=0):
+    rng = np.random.default_rng(seed)
+    items = [CddaItem(id=f"item_{i}", name=f"item {i}", embedding=rng.normal(size=16)) for i in range(60)]
+    materials = [
+        WikidataMaterial(qid=f"Q{i}", label=f"m{i}", embedding=rng.normal(size=16)) for i in range(20)
+    ]
+    return rng, items, materials
+
+
+def _pairs(results):
+    return [(r.wikidata_id, r.cdda_id, r.confidence_score, r.review_needed) for r in results]
+
+
+def test_incremental_update_matches_full_rerun(tmp_path):
+    rng, items, materials = _world()
+    matcher = MaterialMatcher(threshold=0.5)
+
+    state = MatchState(matcher)
+    first = state.update(materials, items)
+    assert first.rescored_materials == 20 and first.pairs_scored == 20 * 60
+    assert _pairs(state.results()) == _pairs(matcher.match(materials, items))
+
+    path = str(tmp_path / "state" / "matches.json")
+    state.save(path)
+    state = MatchState.load(path, matcher)
+
+    # nothing changed: nothing scored
+    assert state.update(materials, items).pairs_scored == 0
+
+    # a mod adds items, changes one, drops one, and a material's text changes
+    best_item = state.results()[0].cdda_id
+    items = [i for i in items if i.id != best_item]
+    items[5] = CddaItem(id=items[5].id, name="changed", embedding=rng.normal(size=16))
+    items += [CddaItem(id=f"mod_{i}", name=f"mod {i}", embedding=materials[i].embedding * 2) for i in range(3)]
+    materials[7] = WikidataMaterial(qid="Q7", label="m7", embedding=rng.normal(size=16))
+
+    stats = state.update(materials, items)
+    assert stats.new_items == 4 and stats.removed_items == 1 and stats.new_materials == 1
+    assert stats.pairs_scored < 20 * len(items)
+    assert _pairs(state.results()) == _pairs(matcher.match(materials, items))
+    assert state.results()[1].cdda_id == "mod_1"
+
+
+def test_incremental_top_k():
+    rng, items, materials = _world(1)
+    matcher = MaterialMatcher()
+    state = MatchState(matcher, k=3)
+    state.update(materials, items)
+
+    items = items[:40] + [CddaItem(id="new", name="new", embedding=materials[2].embedding)]
+    state.update(materials, items)
+
+    expected = matcher.match_top_k(materials, items, k=3)
+    got = state.top_k()
+    assert list(got) == list(expected)
+    for qid in got:
+        assert [r.cdda_id for r in got[qid]] == [r.cdda_id for r in expected[qid]]
+        assert np.allclose([r.confidence_score for r in got[qid]],
+                           [r.confidence_score for r in expected[qid]])
+    assert got["Q2"][0].cdda_id == "new"
@@ -1,6 +1,9 @@
 import numpy as np
 from p3_core.types import WikidataMaterial, CddaItem
+from p3_matcher.blocking import lexical_keys
+from p3_matcher import parallel_matching
 from p3_matcher.material_matcher import MaterialMatcher
+from p3_embeddings.matcher_utils import cosine_similarity, top_k_similar
 
 
 def test_basic_material_match():
@@ -60,3 +63,184 @@ def test_basic_material_match():
     assert result.cdda_id == "steel_sword"
     assert result.confidence_score > 0.85
     assert result.review_needed is False
+
+
+def _reference_match(materials, items, threshold):
+    """
+    The original per-pair loop, kept as the behavioural reference.
+    """
+    results = []
+    for material in materials:
+        if material.embedding is None:
+            continue
+        best_score, best_item = 0.0, None
+        for item in items:
+            if item.embedding is None:
+                continue
+            score = cosine_similarity(material.embedding, item.embedding)
+            if score > best_score:
+                best_score, best_item = score, item
+        if best_item is not None:
+            results.append((material.qid, best_item.id, best_score, best_score < threshold))
+    return results
+
+
+def test_blocked_match_equals_per_pair_loop():
+    rng = np.random.default_rng(7)
+    base = rng.normal(size=(40, 16)).astype(np.float32)
+
+    item_vectors = list(base) + [base[3], base[3], np.zeros(16, np.float32), None]
+    items = [
+        CddaItem(id=f"item_{i}", name=f"item {i}", embedding=v)
+        for i, v in enumerate(item_vectors)
+    ]
+    material_vectors = list(base[:25] + 0.3 * rng.normal(size=(25, 16)).astype(np.float32))
+    material_vectors += [base[3], -np.ones(16, np.float32), np.zeros(16, np.float32), None]
+    materials = [
+        WikidataMaterial(qid=f"Q{i}", label=f"m{i}", embedding=v)
+        for i, v in enumerate(material_vectors)
+    ]
+
+    expected = _reference_match(materials, items, 0.85)
+    for block_size in (1, 7, 1024):
+        results = MaterialMatcher(threshold=0.85, block_size=block_size).match(materials, items)
+        got = [(r.wikidata_id, r.cdda_id, r.confidence_score, r.review_needed) for r in results]
+        assert got == expected
+
+    tie = [r for r in results if r.wikidata_id == "Q25"][0]
+    assert tie.cdda_id == "item_3"
+
+
+def test_top_k_similar_partial_selection_keeps_tie_order():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(30, 8))
+    vectors[20] = vectors[4]
+    candidates = [(f"c{i}", v) for i, v in enumerate(vectors)] + [("none", None)]
+
+    got = top_k_similar(vectors[4], candidates, k=4, threshold=-1.0)
+
+    scores = [(cid, cosine_similarity(vectors[4], emb)) for cid, emb in candidates]
+    expected = sorted(scores, key=lambda x: x[1], reverse=True)[:4]
+    assert [cid for cid, _ in got] == [cid for cid, _ in expected]
+    assert got[0][0] == "c4" and got[1][0] == "c20"
+    assert np.allclose([s for _, s in got], [s for _, s in expected])
+
+
+def test_top_k_reverse_and_mutual_matching():
+    rng = np.random.default_rng(2)
+    base = rng.normal(size=(12, 16))
+    items = [CddaItem(id=f"item_{i}", name=f"item {i}", embedding=v) for i, v in enumerate(base)]
+    # two materials near item_0, one near item_5
+    materials = [
+        WikidataMaterial(qid="Q0", label="a", embedding=base[0] + 0.05 * rng.normal(size=16)),
+        WikidataMaterial(qid="Q1", label="b", embedding=base[0] + 0.4 * rng.normal(size=16)),
+        WikidataMaterial(qid="Q5", label="c", embedding=base[5]),
+    ]
+    matcher = MaterialMatcher()
+
+    for block_size in (3, 1024):
+        matcher.block_size = block_size
+        ranked = matcher.match_top_k(materials, items, k=3)
+        assert list(ranked) == ["Q0", "Q1", "Q5"]
+        for qid, candidates in ranked.items():
+            material = next(m for m in materials if m.qid == qid)
+            expected = top_k_similar(material.embedding, [(i.id, i.embedding) for i in items], k=3)
+            assert [r.cdda_id for r in candidates] == [cid for cid, _ in expected]
+
+    forward = matcher.match(materials, items)
+    assert [r.cdda_id for r in forward] == ["item_0", "item_0", "item_5"]
+
+    reverse = {r.cdda_id: r.wikidata_id for r in matcher.match_items(materials, items)}
+    assert reverse["item_0"] == "Q0" and reverse["item_5"] == "Q5"
+
+    mutual = matcher.match_mutual(materials, items)
+    assert [(r.wikidata_id, r.cdda_id) for r in mutual] == [("Q0", "item_0"), ("Q5", "item_5")]
+
+
+def test_top_k_leader_equals_match_on_near_ties():
+    rng = np.random.default_rng(1)
+    base = rng.normal(size=(6, 16)).astype(np.float32)
+    # items 6..8 are float-noise copies of items 0..2
+    noise = np.float32(1e-7) * rng.normal(size=(3, 16)).astype(np.float32)
+    vectors = np.vstack([base, base[:3] * np.float32(1.0000001) + noise])
+    items = [CddaItem(id=f"item_{i}", name=f"item {i}", embedding=v) for i, v in enumerate(vectors)]
+    materials = [
+        WikidataMaterial(qid=f"Q{i}", label=f"m{i}", embedding=v)
+        for i, v in enumerate((base[:3] + 0.001 * rng.normal(size=(3, 16))).astype(np.float32))
+    ]
+    matcher = MaterialMatcher(block_size=4)
+
+    best = matcher.match(materials, items)
+    for k in (1, 3):
+        ranked = matcher.match_top_k(materials, items, k=k)
+        assert [ranked[r.wikidata_id][0] for r in best] == best
+
+
+def test_lexical_blocking_prunes_pairs_and_falls_back():
+    assert {"t:scrap", "t:iron", "g:iro"} <= lexical_keys(["scrap_iron"])
+
+    rng = np.random.default_rng(5)
+    names = ["scrap iron", "steel sword", "wood plank", "aluminum can", "cotton rag", "glass shard"]
+    items = [
+        CddaItem(id=name.replace(" ", "_"), name=name, materials=[name.split()[0]],
+                 embedding=rng.normal(size=8))
+        for name in names
+    ]
+    materials = [
+        WikidataMaterial(qid="Q677", label="iron", aliases=["Fe"], embedding=items[0].embedding),
+        WikidataMaterial(qid="Q663", label="aluminium", embedding=items[3].embedding),
+        WikidataMaterial(qid="Q1", label="xyzzy", embedding=items[4].embedding),
+    ]
+
+    matcher = MaterialMatcher()
+    results, stats = matcher.match_blocked(materials, items, measure_recall=True)
+
+    assert [(r.wikidata_id, r.cdda_id) for r in results] == [
+        ("Q677", "scrap_iron"), ("Q663", "aluminum_can"), ("Q1", "cotton_rag"),
+    ]
+    assert stats.fallbacks == 1
+    assert stats.pairs_total == 18 and stats.pairs_scored < 18
+    assert 0.0 < stats.pruning_rate < 1.0
+    assert stats.recall == 1.0 and stats.recall_loss == 0.0
+    assert [r.confidence_score for r in results] == [
+        r.confidence_score for r in matcher.match(materials, items)
+    ]
+
+    # a second "iron" shares Q677's candidate block; full_fraction=0 scores everything in full
+    twins = materials + [WikidataMaterial(qid="Q2", label="iron", embedding=2 * items[0].embedding)]
+    grouped, _ = matcher.match_blocked(twins, items)
+    assert grouped[:3] == results and grouped[3].cdda_id == "scrap_iron"
+    full, full_stats = matcher.match_blocked(materials, items, full_fraction=0.0)
+    assert full == matcher.match(materials, items)
+    assert full_stats.fallbacks == 3 and full_stats.pairs_scored == 18
+
+
+def test_parallel_matching_equals_serial():
+    rng = np.random.default_rng(11)
+    base = rng.normal(size=(30, 16)).astype(np.float32)
+    items = [CddaItem(id=f"item_{i}", name=f"item {i}", embedding=v)
+             for i, v in enumerate(list(base) + [base[2]])]
+    materials = [WikidataMaterial(qid=f"Q{i}", label=f"m{i}", embedding=v)
+                 for i, v in enumerate(rng.normal(size=(50, 16)).astype(np.float32))]
+
+    serial = MaterialMatcher(block_size=8)
+    parallel = MaterialMatcher(block_size=8, workers=3)
+
+    assert parallel.match(materials, items) == serial.match(materials, items)
+    assert parallel.match_items(materials, items) == serial.match_items(materials, items)
+    assert parallel.match_top_k(materials, items, k=4) == serial.match_top_k(materials, items, k=4)
+
+
+def test_parallel_matching_shards_small_inputs_and_reuses_the_pool():
+    rng = np.random.default_rng(12)
+    source = rng.normal(size=(40, 8))
+    target = rng.normal(size=(25, 8))
+
+    serial = parallel_matching.parallel_matches(source, target, k=3)
+    sharded = parallel_matching.parallel_matches(source, target, k=3, workers=2)
+    pool = parallel_matching._POOLS[2]   # default block_size, 40 rows: still sharded
+    again = parallel_matching.parallel_matches(source, target, k=1, workers=2)
+
+    assert all((a == b).all() for a, b in zip(sharded, serial))
+    assert all((a == b).all() for a, b in zip(again, parallel_matching.parallel_matches(source, target)))
+    assert parallel_matching._POOLS[2] is pool
@@ -0,0 +1,47 @@
+from p3_core.columnar_store import ItemStore, MaterialStore
+from p3_core.types import CddaItem, WikidataMaterial
+from p3_physics.physics_propagator import PhysicsPropagator
+
+
+MATERIALS = [
+    WikidataMaterial(qid="Q1", label="steel", density=7.85, melting_point=1450.0),
+    WikidataMaterial(qid="Q2", label="wood", density=0.6, thermal_conductivity=0.15),
+    WikidataMaterial(qid="Q3", label="plastic"),
+]
+BREAKDOWNS = {
+    "knife": {"steel": 2.0, "wood": 1.0},
+    "plank": {"wood": 4.0, "unobtainium": 3.0},
+    "bag": {"plastic": 1.0},
+    "rock": {"stone": 1.0},
+}
+
+
+def _items():
+    return [CddaItem(id=i, name=i) for i in BREAKDOWNS]
+
+
+def test_propagate_all_matches_per_item_propagate():
+    index = {m.label: m for m in MATERIALS}
+    expected_items = _items()
+    expected = [PhysicsPropagator(index).propagate(i, BREAKDOWNS[i.id]) for i in expected_items]
+
+    items = _items()
+    got = PhysicsPropagator(index).propagate_all(items, BREAKDOWNS)
+
+    assert got == expected
+    assert [i.physics for i in items] == [i.physics for i in expected_items]
+    assert got[0]["density"] == (7.85 * 2 + 0.6) / 3 and got[3] == {}
+
+
+def test_propagate_all_on_columnar_stores():
+    expected = PhysicsPropagator({m.label: m for m in MATERIALS}).propagate_all(_items(), BREAKDOWNS)
+
+    material_store = MaterialStore.from_materials(MATERIALS)
+    item_store = ItemStore.from_items(_items())
+    index = {view.label: view for view in material_store}
+
+    got = PhysicsPropagator(index).propagate_all(item_store, BREAKDOWNS)
+
+    assert got == expected
+    assert item_store["knife"].physics == expected[0]
+    assert item_store["rock"].physics is None
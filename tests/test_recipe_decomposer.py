@@ -0,0 +1,61 @@
+from p3_core.types import CddaItem
+from p3_recipes.recipe_decomposer import RecipeDecomposer
+from p3_recipes.recipe_index import attach_recipes, build_recipe_index, normalize_components
+
+
+RECIPE_ENTRIES = [
+    {
+        "type": "recipe",
+        "result": "sword",
+        "components": [
+            [["steel_lump", 2], ["steel_chunk", 8]],
+            [["leather", 1]],
+        ],
+    },
+    {"type": "recipe", "result": "sword", "components": [[["scrap", 20]]]},
+    {"type": "recipe", "result": "nails", "result_mult": 10, "components": [[["scrap", 5]]]},
+    {"type": "recipe", "result": "old_thing", "obsolete": True, "components": [[["rag", 1]]]},
+    {"type": "uncraft", "result": "sword", "components": [[["scrap", 1]]]},
+]
+
+
+def test_build_recipe_index_normalizes_alternatives():
+    first = build_recipe_index(RECIPE_ENTRIES)
+    weighted = build_recipe_index(RECIPE_ENTRIES, alternatives="weighted")
+
+    assert first == {
+        "sword": [{"steel_lump": 2.0, "leather": 1.0}, {"scrap": 20.0}],
+        "nails": [{"scrap": 0.5}],
+    }
+    assert weighted["sword"][0] == {"steel_lump": 1.0, "steel_chunk": 4.0, "leather": 1.0}
+
+
+def test_requirement_lists_are_not_taken_for_items():
+    components = [
+        [["cordage_short", 1, "LIST"], ["string_36", 2], ["rag", 4]],
+        [["welding_standard", 5, "LIST"]],
+        [["steel_lump", 1]],
+    ]
+
+    assert normalize_components(components) == {"string_36": 2.0, "steel_lump": 1.0}
+    assert normalize_components(components, alternatives="weighted") == {
+        "string_36": 1.0, "rag": 2.0, "steel_lump": 1.0,
+    }
+
+
+def test_decompose_all_uses_attached_recipes():
+    items = [
+        CddaItem(id="sword", name="sword"),
+        CddaItem(id="steel_lump", name="steel lump", materials=["steel"]),
+        CddaItem(id="leather", name="leather", materials=["leather"]),
+        CddaItem(id="nails", name="nails"),
+        CddaItem(id="scrap", name="scrap", materials=["steel"]),
+    ]
+    assert attach_recipes(items, build_recipe_index(RECIPE_ENTRIES)) == 2
+
+    decomposer = RecipeDecomposer({item.id: item for item in items})
+    breakdown = decomposer.decompose_all()
+
+    assert breakdown["sword"] == {"steel": 2.0, "leather": 1.0}
+    assert breakdown["nails"] == {"steel": 0.5}
+    assert breakdown["scrap"] == {"steel": 1.0}
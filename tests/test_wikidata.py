@@ -0,0 +1,400 @@
+import os
+import re
+import json
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+import requests
+
+from p3_core.columnar_store import MaterialStore
+from p3_core.types import WikidataMaterial
+from p3_wikidata import wikidata_materials_client as client_module
+from p3_wikidata.response_cache import CacheMiss, SparqlResponseCache
+from p3_wikidata.sparql_stream import iter_bindings, merge_material, paginate
+from p3_wikidata.units import normalize_materials, normalize_store
+from p3_wikidata.wikidata_materials_client import WikidataMaterialsClient
+
+
+def _binding(qid, label, density=None):
+    row = {
+        "material": {"value": f"http://www.wikidata.org/entity/{qid}"},
+        "materialLabel": {"value": label},
+    }
+    if density is not None:
+        row["density"] = {"value": str(density)}
+    return row
+
+
+class StandInSparql:
+    """
+    Local SPARQL endpoint: answers each query with the rows registered
+    for its first line, optionally failing the first few attempts.
+    """
+
+    def __init__(self, responses, failures=None, delay=0.0):
+        self.responses = responses
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)["query"][0]
+                key = query.splitlines()[0].lstrip("# ").strip()
+                with stand_in.lock:
+                    stand_in.requests.append(key)
+                    stand_in.in_flight += 1
+                    stand_in.max_in_flight = max(stand_in.max_in_flight, stand_in.in_flight)
+                    fail = stand_in.failures.get(key, [])
+                    status = fail.pop(0) if fail else 200
+                try:
+                    time.sleep(stand_in.delay)
+                    rows = stand_in.responses[key]
+                    if callable(rows):
+                        rows = rows(query)
+                    page = re.search(r"LIMIT (\d+) OFFSET (\d+)\s*$", query)
+                    if page:
+                        offset = int(page.group(2))
+                        rows = rows[offset:offset + int(page.group(1))]
+                    body = b"{}" if status != 200 else json.dumps(
+                        {"head": {"vars": ["material"]}, "results": {"bindings": rows}}
+                    ).encode("utf-8")
+                    self.send_response(status)
+                    if status == 429:
+                        self.send_header("Retry-After", "0")
+                    self.send_header("Content-Type", "application/sparql-results+json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stand_in.lock:
+                        stand_in.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/sparql"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def queries_dir(tmp_path):
+    for name in ("elements", "materials", "alloys"):
+        (tmp_path / f"{name}.sparql").write_text(f"# {name}\nSELECT ?material WHERE {{}}\n")
+    return str(tmp_path)
+
+
+RESPONSES = {
+    "elements": [_binding("Q677", "iron", 7.874), _binding("Q753", "copper", 8.96)],
+    "materials": [_binding("Q11427", "steel"), _binding("Q753", "copper")],
+    "alloys": [_binding("Q11427", "steel", 7.85), _binding("Q39782", "brass")],
+}
+FILES = ["elements.sparql", "materials.sparql", "alloys.sparql"]
+
+
+def test_concurrent_fetch_retries_and_dedupes(queries_dir):
+    stand_in = StandInSparql(
+        RESPONSES,
+        failures={"elements": [503, 429], "alloys": [502]},
+        delay=0.2,
+    )
+    client = WikidataMaterialsClient(
+        queries_dir, endpoint=stand_in.url, query_files=FILES,
+        max_workers=3, backoff_factor=0,
+    )
+    try:
+        materials = client.fetch_all_materials()
+    finally:
+        client.close()
+        stand_in.close()
+
+    assert [m.qid for m in materials] == ["Q677", "Q753", "Q11427", "Q39782"]
+    steel = next(m for m in materials if m.qid == "Q11427")
+    assert steel.density == 7.85          # later queries win, as in the serial merge
+    assert stand_in.requests.count("elements") == 3
+    assert stand_in.requests.count("alloys") == 2
+    assert stand_in.max_in_flight > 1
+
+
+def test_serial_and_concurrent_give_the_same_list(queries_dir):
+    stand_in = StandInSparql(RESPONSES)
+    client = WikidataMaterialsClient(queries_dir, endpoint=stand_in.url, query_files=FILES)
+    try:
+        serial = client.fetch_all_materials(concurrent=False)
+        concurrent = client.fetch_all_materials()
+    finally:
+        client.close()
+        stand_in.close()
+
+    assert serial == concurrent
+
+
+def test_session_is_created_once_across_threads(queries_dir):
+    client = WikidataMaterialsClient(queries_dir)
+    start = threading.Barrier(8)
+    sessions = []
+
+    def grab():
+        start.wait()
+        sessions.append(client.session)
+
+    threads = [threading.Thread(target=grab) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    client.close()
+
+    assert len(sessions) == 8 and all(s is sessions[0] for s in sessions)
+
+
+def test_retries_give_up_after_budget(queries_dir):
+    stand_in = StandInSparql(RESPONSES, failures={"elements": [503] * 10})
+    client = WikidataMaterialsClient(
+        queries_dir, endpoint=stand_in.url, query_files=["elements.sparql"],
+        retries=2, backoff_factor=0,
+    )
+    try:
+        with pytest.raises(requests.exceptions.RequestException):
+            client.fetch_all_materials()
+    finally:
+        client.close()
+        stand_in.close()
+    assert stand_in.requests.count("elements") == 3
+
+
+def test_response_cache_ttl_force_refresh_and_offline(queries_dir, tmp_path):
+    cache_dir = str(tmp_path / "sparql_cache")
+    stand_in = StandInSparql(RESPONSES)
+    try:
+        client = WikidataMaterialsClient(
+            queries_dir, endpoint=stand_in.url, query_files=FILES,
+            cache=SparqlResponseCache(cache_dir),
+        )
+        cold = client.fetch_all_materials()
+        assert len(stand_in.requests) == 3
+
+        # warm run: no network at all
+        warm = client.fetch_all_materials()
+        assert warm == cold and len(stand_in.requests) == 3
+
+        # force refresh goes back to the endpoint
+        WikidataMaterialsClient(
+            queries_dir, endpoint=stand_in.url, query_files=FILES,
+            cache=SparqlResponseCache(cache_dir), force_refresh=True,
+        ).fetch_all_materials()
+        assert len(stand_in.requests) == 6
+
+        # expired entries are refetched
+        WikidataMaterialsClient(
+            queries_dir, endpoint=stand_in.url, query_files=["alloys.sparql"],
+            cache=SparqlResponseCache(cache_dir, ttl=-1),
+        ).fetch_all_materials()
+        assert len(stand_in.requests) == 7
+    finally:
+        stand_in.close()
+
+    # endpoint gone: offline replay serves any age, and stale entries
+    # cover network failures in online mode
+    offline = WikidataMaterialsClient(
+        queries_dir, endpoint=stand_in.url, query_files=FILES,
+        cache=SparqlResponseCache(cache_dir, ttl=-1), offline=True,
+    )
+    assert offline.fetch_all_materials() == cold
+
+    online = WikidataMaterialsClient(
+        queries_dir, endpoint=stand_in.url, query_files=FILES,
+        cache=SparqlResponseCache(cache_dir, ttl=-1), retries=0,
+    )
+    assert online.fetch_all_materials() == cold
+
+    (tmp_path / "new.sparql").write_text("# new\nSELECT ?material WHERE {}\n")
+    offline.query_files = ["new.sparql"]
+    with pytest.raises(CacheMiss):
+        offline.fetch_all_materials()
+
+
+def test_iter_bindings_across_chunk_boundaries():
+    rows = [_binding("Q%d" % i, "m \u00e9 %d" % i, i) for i in range(20)]
+    text = json.dumps({"head": {"vars": []}, "results": {"bindings": rows}}, indent=1)
+
+    for size in (1, 7, 64, len(text)):
+        chunks = (text[i:i + size] for i in range(0, len(text), size))
+        assert list(iter_bindings(chunks)) == rows
+
+    with pytest.raises(ValueError):
+        list(iter_bindings([text[: len(text) // 2]]))
+
+
+def test_paginated_streaming_fetch_merges_rows_per_qid(queries_dir):
+    assert paginate("SELECT * WHERE {}\nLIMIT 300", 50, 100).endswith(
+        "}\nORDER BY ?material\nLIMIT 50 OFFSET 100\n"
+    )
+
+    # ordered by QID; Q2 has three rows (multi-valued density, missing label)
+    # that straddle the page boundaries at page_size=2
+    rows = [
+        _binding("Q1", "iron", 7.87),
+        _binding("Q2", "", None),
+        _binding("Q2", "steel", 7.85),
+        _binding("Q2", "steel", 8.05),
+        _binding("Q3", "tin"),
+    ]
+    stand_in = StandInSparql({"elements": rows})
+    client = WikidataMaterialsClient(
+        queries_dir, endpoint=stand_in.url, query_files=["elements.sparql"], page_size=2,
+    )
+    try:
+        materials = client.fetch_all_materials()
+    finally:
+        client.close()
+        stand_in.close()
+
+    assert [(m.qid, m.label, m.density) for m in materials] == [
+        ("Q1", "iron", 7.87), ("Q2", "steel", 7.85), ("Q3", "tin", None),
+    ]
+    assert stand_in.requests == ["elements"] * 3
+
+
+def test_enrichment_fills_aliases_and_properties_in_batches(tmp_path):
+    template = os.path.join(os.path.dirname(client_module.__file__), "queries", "physical_properties.sparql")
+    shutil.copy(template, tmp_path / "physical_properties.sparql")
+    key = open(template, encoding="utf-8").readline().lstrip("# ").strip()
+
+    known = {
+        "Q677": {"aliases": {"value": "Fe|ferrum"}, "density": {"value": "7.874"}},
+        "Q753": {"aliases": {"value": ""}, "melting_point": {"value": "1084.62"}},
+    }
+    batches = []
+
+    def answer(query):
+        qids = re.findall(r"wd:(Q\d+)", query)
+        batches.append(qids)
+        return [
+            dict(known[q], material={"value": f"http://www.wikidata.org/entity/{q}"})
+            for q in qids if q in known
+        ]
+
+    stand_in = StandInSparql({key: answer})
+    materials = [
+        WikidataMaterial(qid="Q677", label="iron", density=8.0),
+        WikidataMaterial(qid="Q753", label="copper"),
+        WikidataMaterial(qid="Q1", label="unknown"),
+        WikidataMaterial(qid="Q677", label="iron (dup)"),
+    ]
+    client = WikidataMaterialsClient(str(tmp_path), endpoint=stand_in.url, max_workers=2, backoff_factor=0)
+    try:
+        enriched = client.enrich_materials(materials, batch_size=2)
+    finally:
+        client.close()
+        stand_in.close()
+
+    assert sorted(len(b) for b in batches) == [1, 2]
+    assert enriched == 2
+    assert materials[0].aliases == ["Fe", "ferrum"] and materials[0].density == 8.0
+    assert materials[3].aliases == ["Fe", "ferrum"]
+    assert materials[3].aliases is not materials[0].aliases
+    assert materials[1].melting_point == 1084.62 and materials[1].aliases == []
+    assert materials[2].aliases == [] and materials[2].density is None
+
+
+def test_merge_material_fills_data_fields_only():
+    into = WikidataMaterial(qid="Q1", label="iron", embedding=np.ones(4))
+    other = WikidataMaterial(qid="Q1", label="iron", description="metal", density=7.9,
+                             aliases=["Fe"], embedding=np.zeros(4), units={"density": "Q13147228"})
+    merge_material(into, other)
+
+    assert into.description == "metal" and into.density == 7.9
+    assert into.units == {"density": "Q13147228"}
+    assert into.aliases == ["Fe"] and into.aliases is not other.aliases
+    assert into.embedding.tolist() == [1.0] * 4
+
+
+def test_unit_normalization_vectorized_and_flagged():
+    def materials():
+        return [
+            WikidataMaterial(qid="Q1", label="iron", density=7874.0, melting_point=1811.0,
+                             units={"density": "Q844211", "melting_point": "Q11579"}),
+            WikidataMaterial(qid="Q2", label="tin", density=7.3, melting_point=449.6,
+                             tensile_strength=0.2, units={"density": "Q199", "melting_point": "Q42289",
+                                                          "tensile_strength": "Q21064845"}),
+            WikidataMaterial(qid="Q3", label="odd", density=900.0, thermal_conductivity=5.0,
+                             units={"thermal_conductivity": "Q999"}),
+        ]
+
+    mats = materials()
+    assert normalize_materials(mats) == 2
+    iron, tin, odd = mats
+    assert abs(iron.density - 7.874) < 1e-9 and abs(iron.melting_point - 1537.85) < 1e-9
+    assert abs(tin.melting_point - 232.0) < 1e-9 and abs(tin.tensile_strength - 200.0) < 1e-9
+    assert odd.density == 900.0 and odd.flags[0] == "density:out_of_range"
+    assert odd.thermal_conductivity is None and "thermal_conductivity:unknown_unit:Q999" in odd.flags
+    assert iron.units["density"] == "Q13147228"
+    assert tin.density == 7.3 and tin.units["density"] == "Q13147228"  # unit "1"
+
+    # idempotent
+    before = [(m.density, m.melting_point, list(m.flags)) for m in mats]
+    normalize_materials(mats)
+    assert [(m.density, m.melting_point, list(m.flags)) for m in mats] == before
+
+    # the store pass gives the same numbers on the columns
+    source = materials()
+    store = MaterialStore.from_materials(source)
+    normalize_store(store)
+    for view, m in zip(store, mats):
+        assert view.density == m.density and view.melting_point == m.melting_point
+        assert view.thermal_conductivity == m.thermal_conductivity and view.flags == m.flags
+    # the records the store was built from keep their own units and flags
+    assert [m.units for m in source] == [m.units for m in materials()]
+    assert [m.flags for m in source] == [m.flags for m in materials()]
+
+
+def test_bundled_queries_read_best_rank_statements_only():
+    queries = os.path.join(os.path.dirname(client_module.__file__), "queries")
+    for name in (n for n in os.listdir(queries) if n.endswith(".sparql")):
+        with open(os.path.join(queries, name), encoding="utf-8") as f:
+            text = f.read()
+        assert text.count("psv:") == text.count("a wikibase:BestRank") == 4, name
+        assert "DeprecatedRank" not in text, name
+
+
+def test_client_reads_units_from_bindings(queries_dir):
+    kelvin = "http://www.wikidata.org/entity/Q11579"
+    rows = [
+        dict(_binding("Q677", "iron", 7874.0),
+             density_unit={"value": "http://www.wikidata.org/entity/Q844211"},
+             melting_point={"value": "1811"}, melting_point_unit={"value": kelvin}),
+    ]
+    stand_in = StandInSparql({"elements": rows})
+    client = WikidataMaterialsClient(queries_dir, endpoint=stand_in.url, query_files=["elements.sparql"])
+    try:
+        (iron,) = client.fetch_all_materials()
+    finally:
+        client.close()
+        stand_in.close()
+
+    assert abs(iron.density - 7.874) < 1e-9 and abs(iron.melting_point - 1537.85) < 1e-9
+    assert iron.flags == []
+
+    enrichment_row = client._binding_to_material({
+        "material": {"value": "http://www.wikidata.org/entity/Q677"},
+        "melting_point": {"value": "1811|" + kelvin},
+    })
+    assert enrichment_row.melting_point == 1811.0 and enrichment_row.units == {"melting_point": "Q11579"}